@@ -0,0 +1,330 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+import pandas as pd
+
+from batch_runner import RUNNERS, execute_job
+from dataset_cache import file_fingerprint
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Largest request body accepted, in bytes
+MAX_BODY = 1024 * 1024
+SENTIMENT_METHODS = ('vader', 'textblob', 'distilbert')
+# Rows of per-text sentiment results returned with a sentiment response
+SENTIMENT_PREVIEW_ROWS = 20
+
+# Column stores opened in this worker process, keyed by store_key()
+_worker_stores = {}
+
+
+class RequestError(Exception):
+    """A request the server cannot serve; reported to the client with its HTTP status."""
+
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+
+def store_key(store):
+    """Return (store directory, source fingerprint) of a column store, naming one build of it."""
+    return store.store_dir, json.dumps(store.source, sort_keys=True)
+
+
+def _open_store(key):
+    from column_store import ColumnStore
+
+    if key not in _worker_stores:
+        # A rebuilt store replaces the one opened from the same directory, with its old categories
+        _drop_store(key[0])
+        store = ColumnStore(key[0])
+        if store_key(store) != key:
+            raise RequestError(f"The column store in '{key[0]}' was rebuilt; load the dataset again.",
+                               HTTPStatus.CONFLICT)
+        _worker_stores[key] = store
+    return _worker_stores[key]
+
+
+def _drop_store(store_dir):
+    for key in [key for key in _worker_stores if key[0] == store_dir]:
+        del _worker_stores[key]
+
+
+def _analysis_task(store, job):
+    return execute_job(_open_store(store), job)
+
+
+def _profile_task(store):
+    from column_profiler import profile_columns
+    return profile_columns(_open_store(store))
+
+
+def _plot_task(store, columns, output_dir, fmt, bins, grid):
+    from plot_variable_distribution import compute_histograms, save_distribution_plots
+    histograms = compute_histograms(_open_store(store), columns, bins)
+    return save_distribution_plots(histograms, output_dir, fmt, workers=1, grid=grid)
+
+
+def _sentiment_task(store, column, method, batch_size):
+    from conduct_sentiment_analysis import SentimentAnalysis
+
+    texts = _open_store(store)[column]
+    analysis = SentimentAnalysis()
+    if method == 'vader':
+        scores, sentiments = analysis.vader_sentiment_analysis(texts, workers=1)
+    elif method == 'textblob':
+        scores, sentiments, _ = analysis.textblob_sentiment_analysis(texts, workers=1)
+    else:
+        scores, sentiments = analysis.distilbert_sentiment_analysis(texts, batch_size)
+    results = pd.DataFrame({'text': texts, 'score': scores, 'sentiment': sentiments})
+    return {
+        'column': column,
+        'method': method,
+        'rows': len(results),
+        'mean_score': float(results['score'].mean()),
+        'sentiment_counts': results['sentiment'].value_counts().to_dict(),
+        'preview': results.head(SENTIMENT_PREVIEW_ROWS).to_dict(orient='records'),
+    }
+
+
+def _to_json(value):
+    """Return value as plain JSON types, with NaN and infinite floats (which JSON cannot carry) as null."""
+    if isinstance(value, dict):
+        return {str(key): _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, (str, bool, int)) or value is None:
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, np.ndarray):
+        return _to_json(value.tolist())
+    if isinstance(value, np.generic):
+        return _to_json(value.item())
+    if isinstance(value, pd.DataFrame):
+        return _to_json(value.reset_index().to_dict(orient='records'))
+    if isinstance(value, pd.Series):
+        return _to_json(value.to_dict())
+    if value is pd.NaT or value is pd.NA:
+        return None
+    return str(value)
+
+
+class AnalysisServer:
+    """Serve analyses of datasets that stay loaded, as memory-mapped column stores, between requests.
+
+    Each dataset is converted once into a column store and kept as a DataAnalysis handle. Worker
+    processes map the same store files, so every worker and every client shares one copy of the data
+    in the page cache. Requests are JSON over HTTP and run concurrently in the worker pool.
+    """
+
+    def __init__(self, workers=None, store_root=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.store_root = store_root
+        self.pool = None
+        self.datasets = {}
+        self._loading = {}
+        self.requests_served = 0
+
+    async def get_dataset(self, path, load=True):
+        """Return the DataAnalysis handle of a dataset, loading it on first use and again when the file changes."""
+        if not isinstance(path, str) or not path:
+            raise RequestError("Name the dataset with a 'dataset' path.")
+        key = os.path.abspath(path)
+        if not load:
+            if key not in self.datasets:
+                raise RequestError(f"Dataset '{path}' is not loaded.", HTTPStatus.NOT_FOUND)
+            return self.datasets[key]
+        if not os.path.exists(key):
+            raise RequestError(f"Dataset file '{path}' does not exist.", HTTPStatus.NOT_FOUND)
+        if key in self.datasets:
+            handle = self.datasets[key]
+            fingerprint = await asyncio.get_running_loop().run_in_executor(None, file_fingerprint, key)
+            if fingerprint == handle.dataset.source:
+                return handle
+            # The file changed since its store was built: rebuild it, and have the workers let go of the old one
+            self.datasets.pop(key, None)
+            self._drop_in_workers(handle.dataset.store_dir)
+        # Concurrent first requests for one dataset share a single load
+        if key not in self._loading:
+            self._loading[key] = asyncio.ensure_future(
+                asyncio.get_running_loop().run_in_executor(None, self._load, key))
+        try:
+            handle = await self._loading[key]
+        finally:
+            self._loading.pop(key, None)
+        if handle.dataset is None:
+            raise RequestError(f"Could not load dataset '{path}'.")
+        self.datasets[key] = handle
+        return handle
+
+    def _load(self, path):
+        from column_store import default_store_dir
+        from main import DataAnalysis
+
+        store_dir = default_store_dir(path, self.store_root) if self.store_root else ''
+        return DataAnalysis(path, column_store=store_dir)
+
+    def _drop_in_workers(self, store_dir):
+        """Ask the worker processes to close a column store; workers that miss it replace it on next use."""
+        if self.pool is not None:
+            for _ in range(self.workers):
+                self.pool.submit(_drop_store, store_dir)
+
+    async def _in_pool(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+
+    async def load(self, request):
+        handle = await self.get_dataset(request.get('dataset'))
+        return {'dataset': handle.file_path, 'rows': len(handle.dataset), 'columns': list(handle.dataset.columns),
+                'store_dir': handle.dataset.store_dir}
+
+    async def list_datasets(self, request):
+        return [{'dataset': key, 'rows': len(handle.dataset)} for key, handle in self.datasets.items()]
+
+    async def unload(self, request):
+        handle = await self.get_dataset(request.get('dataset'), load=False)
+        del self.datasets[os.path.abspath(handle.file_path)]
+        self._drop_in_workers(handle.dataset.store_dir)
+        return {'unloaded': handle.file_path}
+
+    async def summarize(self, request):
+        handle = await self.get_dataset(request.get('dataset'))
+        if handle.profile is None:
+            handle.profile = await self._in_pool(_profile_task, store_key(handle.dataset))
+        return handle.profile
+
+    async def analyze(self, request):
+        handle = await self.get_dataset(request.get('dataset'))
+        job = {key: value for key, value in request.items() if key != 'dataset'}
+        if job.get('analysis') not in RUNNERS:
+            raise RequestError(f"Unknown analysis '{job.get('analysis')}'. Choose from: {', '.join(RUNNERS)}.")
+        return await self._in_pool(_analysis_task, store_key(handle.dataset), job)
+
+    async def plot(self, request):
+        from plot_variable_distribution import DEFAULT_BINS
+
+        handle = await self.get_dataset(request.get('dataset'))
+        if 'output_dir' not in request:
+            raise RequestError("Give an 'output_dir' for the plot files.")
+        paths = await self._in_pool(_plot_task, store_key(handle.dataset), request.get('columns'),
+                                    request['output_dir'], request.get('format', 'png'),
+                                    request.get('bins', DEFAULT_BINS), request.get('grid', False))
+        return {'files': paths}
+
+    async def sentiment(self, request):
+        from conduct_sentiment_analysis import DEFAULT_BATCH_SIZE
+
+        handle = await self.get_dataset(request.get('dataset'))
+        column, method = request.get('column'), request.get('method', 'vader')
+        if column not in handle.dataset.columns:
+            raise RequestError(f"Column '{column}' does not exist in the dataset.")
+        if method not in SENTIMENT_METHODS:
+            raise RequestError(f"Unknown sentiment method '{method}'. Choose from: {', '.join(SENTIMENT_METHODS)}.")
+        return await self._in_pool(_sentiment_task, store_key(handle.dataset), column, method,
+                                   request.get('batch_size', DEFAULT_BATCH_SIZE))
+
+    async def status(self, request):
+        return {'datasets': len(self.datasets), 'workers': self.workers, 'requests_served': self.requests_served}
+
+    def routes(self):
+        return {
+            ('GET', '/status'): self.status,
+            ('GET', '/datasets'): self.list_datasets,
+            ('POST', '/datasets'): self.load,
+            ('DELETE', '/datasets'): self.unload,
+            ('POST', '/summarize'): self.summarize,
+            ('POST', '/analyze'): self.analyze,
+            ('POST', '/plot'): self.plot,
+            ('POST', '/sentiment'): self.sentiment,
+        }
+
+    async def handle_connection(self, reader, writer):
+        start = time.perf_counter()
+        status, payload = HTTPStatus.OK, None
+        try:
+            method, path, request = await self._read_request(reader)
+            route = self.routes().get((method, path))
+            if route is None:
+                raise RequestError(f"No route for {method} {path}.", HTTPStatus.NOT_FOUND)
+            payload = {'result': await route(request)}
+        except RequestError as e:
+            status, payload = e.status, {'error': str(e)}
+        except (ValueError, KeyError, TypeError) as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {'error': f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(e).__name__}: {e}"}
+        payload['elapsed_s'] = time.perf_counter() - start
+        body = json.dumps(_to_json(payload), allow_nan=False).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('ascii') + body)
+        self.requests_served += 1
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) < 2:
+            raise RequestError("Malformed request line.")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        if length > MAX_BODY:
+            raise RequestError("Request body is too large.", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b''
+        request = json.loads(body) if body else {}
+        if not isinstance(request, dict):
+            raise RequestError("The request body must be a JSON object.")
+        return request_line[0].upper(), request_line[1].split('?')[0], request
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            if socket_path:
+                server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+                print(f"Analysis server listening on unix socket {socket_path} with {self.workers} workers")
+            else:
+                server = await asyncio.start_server(self.handle_connection, host, port)
+                print(f"Analysis server listening on http://{host}:{port} with {self.workers} workers")
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, workers=None, store_root=None):
+    """Run the analysis server until interrupted."""
+    server = AnalysisServer(workers, store_root)
+    try:
+        asyncio.run(server.serve(host, port, socket_path))
+    except KeyboardInterrupt:
+        print("Analysis server stopped.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve analyses of resident datasets as JSON over HTTP.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="TCP port to listen on")
+    parser.add_argument('--socket', help="listen on this unix socket path instead of TCP")
+    parser.add_argument('--workers', type=int, help="worker processes for analyses")
+    parser.add_argument('--store-root', help="directory for the datasets' column stores")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    run_server(args.host, args.port, args.socket, args.workers, args.store_root)
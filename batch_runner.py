@@ -0,0 +1,145 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from conduct_anova import run_anova
+from conduct_chi_square import run_chi_square
+from conduct_correlation import run_correlation
+from conduct_regression import run_multiple_regression, run_regression
+from conduct_t_test import run_t_test
+
+RUNNERS = {
+    'anova': run_anova,
+    't_test': run_t_test,
+    'chi_square': run_chi_square,
+    'regression': run_regression,
+    'multiple_regression': run_multiple_regression,
+    'correlation': run_correlation,
+}
+
+RESULT_FIELDS = ['id', 'analysis', 'variables', 'test', 'statistic', 'p_value', 'significant',
+                 'elapsed_s', 'error']
+
+# Dataset shared with worker processes; set before the pool starts so forked workers inherit it
+_worker_dataset = None
+
+
+def load_spec(spec_path):
+    """Read a job spec from a JSON or YAML file."""
+    with open(spec_path) as handle:
+        if spec_path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required to read YAML job specs.")
+            spec = yaml.safe_load(handle)
+        else:
+            spec = json.load(handle)
+    if not isinstance(spec, dict) or not isinstance(spec.get('jobs'), list):
+        raise ValueError("The job spec must be a mapping with a 'jobs' list.")
+    return spec
+
+
+def execute_job(dataset, job):
+    """Run one job, e.g. {'analysis': 'anova', 'cont_var': 'Weight', 'cat_var': 'MTRANS'}."""
+    params = {key: value for key, value in job.items() if key not in ('id', 'analysis')}
+    analysis = job.get('analysis')
+    if analysis not in RUNNERS:
+        raise ValueError(f"Unknown analysis '{analysis}'. Choose from: {', '.join(RUNNERS)}.")
+    return RUNNERS[analysis](dataset, **params)
+
+
+def _init_worker(dataset):
+    global _worker_dataset
+    _worker_dataset = dataset
+
+
+def _run_job(job):
+    record = {'id': job.get('id'), 'analysis': job.get('analysis')}
+    start = time.perf_counter()
+    try:
+        result = execute_job(_worker_dataset, job)
+        record.update({field: result.get(field) for field in RESULT_FIELDS if field in result})
+        record.update({key: value for key, value in result.items()
+                       if key not in record and isinstance(value, (int, float, str, bool))})
+        record['error'] = None
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['elapsed_s'] = time.perf_counter() - start
+    return record
+
+
+def run_jobs(dataset, jobs, workers=None):
+    """Run jobs against a read-only dataset in a process pool and return one record per job, in order."""
+    global _worker_dataset
+    jobs = [dict(job, id=job.get('id', str(i))) for i, job in enumerate(jobs, start=1)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        _worker_dataset = dataset
+        return [_run_job(job) for job in jobs]
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Forked workers share the parent's pages copy-on-write instead of receiving a pickled copy
+        _worker_dataset = dataset
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dataset,))
+    with pool:
+        return list(pool.map(_run_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def write_results(records, output_path):
+    """Write job records to a .csv file, or to JSON for any other extension."""
+    if output_path.endswith('.csv'):
+        columns = RESULT_FIELDS + sorted({key for record in records for key in record} - set(RESULT_FIELDS))
+        with open(output_path, 'w', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=columns)
+            writer.writeheader()
+            for record in records:
+                row = dict(record)
+                if isinstance(row.get('variables'), list):
+                    row['variables'] = ';'.join(row['variables'])
+                writer.writerow(row)
+    else:
+        with open(output_path, 'w') as handle:
+            json.dump(records, handle, indent=2, default=str)
+
+
+def run_batch(spec_path, output_path=None, workers=None):
+    """Load the dataset named in a job spec once, run all its jobs and write the results."""
+    from main import DataAnalysis
+
+    spec = load_spec(spec_path)
+    # 'column_store' is a directory, or true for the default location
+    column_store = spec.get('column_store')
+    data_analysis = DataAnalysis(spec['dataset'], compact=spec.get('compact', False),
+                                 column_store='' if column_store is True else column_store)
+    if data_analysis.dataset is None:
+        raise ValueError(f"Could not load dataset '{spec['dataset']}'.")
+
+    start = time.perf_counter()
+    records = run_jobs(data_analysis.dataset, spec['jobs'], workers or spec.get('workers'))
+    elapsed = time.perf_counter() - start
+
+    output_path = output_path or spec.get('output') or os.path.splitext(spec_path)[0] + '_results.json'
+    write_results(records, output_path)
+    failed = sum(1 for record in records if record['error'])
+    print(f"Ran {len(records)} jobs in {elapsed:.2f}s ({failed} failed). Results written to: {output_path}")
+    return records
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSON/YAML spec of analyses without prompts.")
+    parser.add_argument('spec', help="job spec file (.json, .yaml or .yml)")
+    parser.add_argument('--output', help="results file (.json or .csv)")
+    parser.add_argument('--workers', type=int, help="number of worker processes")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    run_batch(args.spec, args.output, args.workers)
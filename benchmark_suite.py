@@ -0,0 +1,285 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from column_profiler import profile_columns
+from instrumentation import current_rss
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ObesityDataSet.csv')
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+TEXT_COLUMN = 'Review'
+# Share of rows with a distinct review text; real review columns repeat many short texts
+TEXT_UNIQUE_RATIO = 0.05
+# Sentiment scorers run on at most this many rows, since they are far slower than the statistics
+DEFAULT_SENTIMENT_ROWS = 50_000
+QUANTILE_POINTS = 1001
+RSS_SAMPLE_INTERVAL_S = 0.01
+# A benchmark is flagged when it is this much slower, or uses this much more memory, than the baseline
+DEFAULT_TOLERANCE = 0.2
+# Slowdowns smaller than this many seconds are treated as timer noise
+MIN_REGRESSION_S = 0.05
+
+_OPENINGS = ["I", "We", "Honestly, I", "My partner and I", "Frankly, we"]
+_VERBS = {
+    'positive': ["love", "really enjoy", "am happy with", "recommend", "appreciate"],
+    'neutral': ["tried", "had", "looked at", "ordered", "noticed"],
+    'negative': ["hate", "am disappointed with", "regret buying", "can't stand", "complained about"],
+}
+_OBJECTS = ["the meals", "the portion sizes", "the new diet plan", "the gym classes", "the healthy snacks",
+            "the walking routine", "the water intake tracker", "the service"]
+_ENDINGS = {
+    'positive': ["It was great!", "Highly recommended.", "Best choice so far.", ""],
+    'neutral': ["Nothing special.", "It was okay.", "", "We'll see."],
+    'negative': ["It was awful.", "Never again.", "Terrible experience!", ""],
+}
+
+
+def _numeric_sampler(column, rng):
+    """Return a function drawing n values from the empirical distribution of a numeric column."""
+    present = column.dropna()
+    positions = np.linspace(0, 1, QUANTILE_POINTS)
+    quantiles = np.quantile(present.to_numpy(dtype=np.float64), positions)
+    null_ratio = column.isna().mean()
+    integral = pd.api.types.is_integer_dtype(column) or pd.api.types.is_bool_dtype(column)
+
+    def sample(n):
+        values = np.interp(rng.random(n), positions, quantiles)
+        if integral:
+            values = np.rint(values).astype(column.dtype)
+        elif null_ratio:
+            values[rng.random(n) < null_ratio] = np.nan
+        return values
+
+    return sample
+
+
+def _categorical_sampler(column, rng):
+    """Return a function drawing n values with the level frequencies of a categorical column."""
+    frequencies = column.value_counts(normalize=True, dropna=False)
+    levels = np.asarray(frequencies.index, dtype=object)
+    probabilities = frequencies.to_numpy(dtype=np.float64)
+    probabilities /= probabilities.sum()
+
+    def sample(n):
+        return levels[rng.choice(len(levels), size=n, p=probabilities)]
+
+    return sample
+
+
+def synthetic_texts(n_rows, rng, unique_ratio=TEXT_UNIQUE_RATIO):
+    """Return n_rows short review texts with a mix of positive, neutral and negative sentiment."""
+    n_unique = max(1, min(n_rows, int(n_rows * unique_ratio)))
+    moods = rng.choice(list(_VERBS), size=n_unique, p=[0.45, 0.25, 0.3])
+    vocabulary = np.empty(n_unique, dtype=object)
+    for i, mood in enumerate(moods):
+        parts = [_OPENINGS[rng.integers(len(_OPENINGS))], _VERBS[mood][rng.integers(len(_VERBS[mood]))],
+                 _OBJECTS[rng.integers(len(_OBJECTS))] + ".", _ENDINGS[mood][rng.integers(len(_ENDINGS[mood]))]]
+        vocabulary[i] = " ".join(part for part in parts if part) + f" #{i}"
+    return vocabulary[rng.integers(0, n_unique, n_rows)]
+
+
+def generate_dataset(n_rows, template=None, seed=0, text_column=TEXT_COLUMN):
+    """Return a synthetic dataset with the template's columns, category levels and value distributions.
+
+    Numeric columns are drawn from their empirical quantile function and categorical columns from their
+    level frequencies, independently of each other. A synthetic review text column is appended.
+    """
+    template = pd.read_csv(TEMPLATE_PATH) if template is None else template
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for column in template.columns:
+        if pd.api.types.is_numeric_dtype(template[column]):
+            sampler = _numeric_sampler(template[column], rng)
+        else:
+            sampler = _categorical_sampler(template[column], rng)
+        columns[column] = sampler(n_rows)
+    if text_column:
+        columns[text_column] = synthetic_texts(n_rows, rng)
+    return pd.DataFrame(columns)
+
+
+class RssMonitor:
+    """Sample the resident set size in a background thread and keep the peak."""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.start_rss = current_rss()
+        self.peak = self.start_rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def _sentiment_benchmark(method):
+    def run(dataset):
+        from conduct_sentiment_analysis import SentimentAnalysis
+        analysis = SentimentAnalysis()
+        texts = dataset[TEXT_COLUMN]
+        if method == 'vader':
+            return analysis.vader_sentiment_analysis(texts)
+        if method == 'textblob':
+            return analysis.textblob_sentiment_analysis(texts)
+        return analysis.distilbert_sentiment_analysis(texts)
+    return run
+
+
+def _analysis(module_name, function_name, *args):
+    def run(dataset):
+        import importlib
+        return getattr(importlib.import_module(module_name), function_name)(dataset, *args)
+    return run
+
+
+BENCHMARKS = {
+    'summarize': profile_columns,
+    'anova': _analysis('conduct_anova', 'run_anova', 'Weight', 'MTRANS'),
+    't_test': _analysis('conduct_t_test', 'run_t_test', 'Height', 'Gender'),
+    'chi_square': _analysis('conduct_chi_square', 'run_chi_square', 'Gender', 'MTRANS'),
+    'regression': _analysis('conduct_regression', 'run_regression', 'Weight', 'Height'),
+    'sentiment_vader': _sentiment_benchmark('vader'),
+    'sentiment_textblob': _sentiment_benchmark('textblob'),
+    'sentiment_distilbert': _sentiment_benchmark('distilbert'),
+}
+
+
+def run_benchmark(name, dataset, repeat=1):
+    """Run one benchmark and return its record; the best of repeat runs is kept."""
+    record = {'benchmark': name, 'rows': len(dataset), 'error': None}
+    best = None
+    try:
+        # Import outside the timed region so the first run does not pay for module loading
+        try:
+            BENCHMARKS[name](dataset.head(100))
+        except Exception:
+            pass
+        for _ in range(repeat):
+            with RssMonitor() as monitor:
+                start, cpu_start = time.perf_counter(), time.process_time()
+                BENCHMARKS[name](dataset)
+                wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+            if best is None or wall < best['wall_s']:
+                best = {'wall_s': wall, 'cpu_s': cpu, 'peak_rss_mb': monitor.peak / 1024 ** 2,
+                        'rss_delta_mb': (monitor.peak - monitor.start_rss) / 1024 ** 2}
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+        return record
+    record.update(best)
+    record['rows_per_s'] = len(dataset) / best['wall_s'] if best['wall_s'] > 0 else None
+    return record
+
+
+def run_suite(row_counts=DEFAULT_ROWS, benchmarks=None, repeat=1, seed=0,
+              sentiment_rows=DEFAULT_SENTIMENT_ROWS):
+    """Generate a dataset for each row count, run the benchmarks on it and return the report."""
+    template = pd.read_csv(TEMPLATE_PATH)
+    benchmarks = benchmarks or list(BENCHMARKS)
+    results = []
+    for n_rows in row_counts:
+        start = time.perf_counter()
+        dataset = generate_dataset(n_rows, template, seed)
+        print(f"Generated {n_rows} rows in {time.perf_counter() - start:.2f}s")
+        for name in benchmarks:
+            data = dataset.head(sentiment_rows) if name.startswith('sentiment') else dataset
+            record = run_benchmark(name, data, repeat)
+            results.append(record)
+            if record['error']:
+                print(f"  {name:<22}{record['rows']:>10}  failed: {record['error']}")
+            else:
+                print(f"  {name:<22}{record['rows']:>10}  {record['wall_s']:>9.3f}s  "
+                      f"{record['peak_rss_mb']:>9.1f} MB  {record['rows_per_s']:>14,.0f} rows/s")
+        del dataset
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'seed': seed,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare_reports(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Return the benchmarks of current that are slower or use more memory than the baseline."""
+    previous = {(record['benchmark'], record['rows']): record
+                for record in baseline['results'] if not record.get('error')}
+    regressions = []
+    for record in current['results']:
+        old = previous.get((record['benchmark'], record['rows']))
+        if old is None or record.get('error'):
+            continue
+        time_ratio = record['wall_s'] / old['wall_s'] if old['wall_s'] else float('inf')
+        slower = time_ratio > 1 + tolerance and record['wall_s'] - old['wall_s'] > MIN_REGRESSION_S
+        # One megabyte is added to both sides so tiny allocations do not produce huge ratios
+        memory_ratio = (record['rss_delta_mb'] + 1) / (old['rss_delta_mb'] + 1)
+        if slower or memory_ratio > 1 + tolerance:
+            regressions.append({'benchmark': record['benchmark'], 'rows': record['rows'],
+                                'time_ratio': time_ratio, 'memory_ratio': memory_ratio})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every analysis on synthetic data of growing size.")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="dataset sizes to benchmark")
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), help="benchmarks to run (default: all)")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per benchmark; the fastest is reported")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic data")
+    parser.add_argument('--sentiment-rows', type=int, default=DEFAULT_SENTIMENT_ROWS,
+                        help="rows scored by the sentiment benchmarks")
+    parser.add_argument('--output', default='benchmark_report.json', help="JSON report to write")
+    parser.add_argument('--baseline', help="earlier JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown or memory growth relative to the baseline")
+    parser.add_argument('--generate', metavar='CSV',
+                        help="only write a synthetic dataset with the first --rows size to CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.generate:
+        generate_dataset(args.rows[0], seed=args.seed).to_csv(args.generate, index=False)
+        print(f"Wrote {args.rows[0]} synthetic rows to: {args.generate}")
+        return 0
+
+    report = run_suite(args.rows, args.benchmarks, args.repeat, args.seed, args.sentiment_rows)
+    with open(args.output, 'w') as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Report written to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare_reports(json.load(handle), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['benchmark']} at {regression['rows']} rows: "
+                  f"{regression['time_ratio']:.2f}x time, {regression['memory_ratio']:.2f}x memory")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
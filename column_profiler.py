@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Numeric columns with at most this many distinct values are analysed as categorical
+CATEGORICAL_MAX_UNIQUE = 10
+
+PROFILE_FIELDS = ['kind', 'analysis_type', 'count', 'null_count', 'nunique', 'mode',
+                  'mean', 'median', 'skew', 'min', 'max']
+
+
+def _profile_numeric(series):
+    values = np.asarray(series, dtype=np.float64)
+    valid = values[~np.isnan(values)]
+    count = len(valid)
+    stats = {'count': count, 'null_count': len(values) - count, 'nunique': 0, 'mode': np.nan,
+             'mean': np.nan, 'median': np.nan, 'skew': np.nan, 'min': np.nan, 'max': np.nan}
+    if count == 0:
+        return stats
+
+    # One sort gives min, max, median, distinct values and the mode (longest run of equal values)
+    ordered = np.sort(valid)
+    starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+    run_lengths = np.diff(np.append(starts, count))
+    stats['nunique'] = len(starts)
+    stats['mode'] = ordered[starts[np.argmax(run_lengths)]]
+    stats['min'] = ordered[0]
+    stats['max'] = ordered[-1]
+    middle = count // 2
+    stats['median'] = ordered[middle] if count % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+    mean = valid.mean()
+    centered = valid - mean
+    squared = centered * centered
+    stats['moments'] = (count, mean, squared.sum(), np.dot(squared, centered), np.dot(squared, squared))
+    m2 = stats['moments'][2] / count
+    m3 = stats['moments'][3] / count
+    stats['mean'] = mean
+    if count >= 3:
+        # Adjusted Fisher-Pearson coefficient, the same estimator as pandas' Series.skew
+        if m2 <= 1e-14 * max(mean * mean, 1.0):
+            stats['skew'] = 0.0
+        else:
+            stats['skew'] = m3 / m2 ** 1.5 * np.sqrt(count * (count - 1)) / (count - 2)
+    return stats
+
+
+def _profile_categorical(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        labels = series.cat.categories
+    else:
+        codes, labels = pd.factorize(series, sort=True)
+    valid = codes[codes >= 0]
+    counts = np.bincount(valid, minlength=len(labels))
+    observed = int(np.count_nonzero(counts))
+    return {'count': len(valid), 'null_count': len(codes) - len(valid), 'nunique': observed,
+            'mode': labels[np.argmax(counts)] if observed else np.nan,
+            'mean': np.nan, 'median': np.nan, 'skew': np.nan, 'min': np.nan, 'max': np.nan}
+
+
+def profile_columns(dataset):
+    """Compute type, counts, mode, mean, median, skewness and range of every column in one pass per column.
+
+    The moments (n, mean, M2, M3, M4) of each numeric column are kept in profile.attrs['moments'].
+    """
+    rows = {}
+    moments = {}
+    for column in dataset.columns:
+        series = dataset[column]
+        if pd.api.types.is_numeric_dtype(series):
+            stats = _profile_numeric(series)
+            stats['kind'] = 'Numerical'
+            if 'moments' in stats:
+                moments[column] = stats.pop('moments')
+        else:
+            stats = _profile_categorical(series)
+            stats['kind'] = 'Categorical'
+        is_categorical = stats['kind'] == 'Categorical' or stats['nunique'] <= CATEGORICAL_MAX_UNIQUE
+        stats['analysis_type'] = 'Categorical' if is_categorical else 'Continuous'
+        rows[column] = stats
+    profile = pd.DataFrame.from_dict(rows, orient='index', columns=PROFILE_FIELDS)
+    profile.attrs['moments'] = moments
+    return profile
+
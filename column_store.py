@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from compact_loader import DEFAULT_CHUNKSIZE
+from dataset_cache import file_fingerprint
+
+DEFAULT_STORE_ROOT = os.path.join(os.path.expanduser('~'), '.cache', 'group2', 'column_stores')
+META_FILE = 'meta.json'
+CODE_DTYPE = np.int32
+
+
+def default_store_dir(file_path, root=DEFAULT_STORE_ROOT):
+    """Return the store directory used for a CSV file when none is given."""
+    digest = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(root, f"{os.path.splitext(os.path.basename(file_path))[0]}-{digest}")
+
+
+def _numeric_dtype(dtypes):
+    """Return the storage dtype of a column parsed as numeric in every chunk, or None if it is not."""
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in dtypes):
+        return None
+    if all(pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+        return np.dtype(bool)
+    if all(pd.api.types.is_integer_dtype(dtype) for dtype in dtypes):
+        return np.dtype(np.int64)
+    return np.dtype(np.float64)
+
+
+def build_column_store(file_path, store_dir, chunksize=DEFAULT_CHUNKSIZE):
+    """Convert a CSV into one memory-mappable .npy file per column and return the opened store.
+
+    The CSV is read twice in chunks. The first pass counts rows and finds the columns that parse as
+    numbers everywhere; those are stored as raw int64, float64 or bool arrays. The second pass writes
+    every other column as int32 codes (-1 for missing) into a dictionary of its distinct strings.
+    """
+    n_rows = 0
+    chunk_dtypes = {}
+    for chunk in pd.read_csv(file_path, chunksize=chunksize):
+        n_rows += len(chunk)
+        for column, dtype in chunk.dtypes.items():
+            chunk_dtypes.setdefault(column, []).append(dtype)
+
+    if os.path.isdir(store_dir):
+        shutil.rmtree(store_dir)
+    os.makedirs(store_dir)
+    columns, arrays, dictionaries = [], {}, {}
+    for i, (column, dtypes) in enumerate(chunk_dtypes.items()):
+        dtype = _numeric_dtype(dtypes)
+        entry = {'name': column, 'file': f"{i}.npy"}
+        if dtype is None:
+            entry.update(kind='category', dtype=np.dtype(CODE_DTYPE).str, categories=f"{i}.categories.json")
+            dictionaries[column] = {}
+        else:
+            entry.update(kind='numeric', dtype=dtype.str)
+        arrays[column] = np.lib.format.open_memmap(os.path.join(store_dir, entry['file']), mode='w+',
+                                                   dtype=np.dtype(entry['dtype']), shape=(n_rows,))
+        columns.append(entry)
+
+    # Text columns are read as strings so a column that looks numeric in one chunk stays consistent
+    string_columns = {column: str for column in dictionaries}
+    start = 0
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, dtype=string_columns):
+        stop = start + len(chunk)
+        for column, array in arrays.items():
+            if column in dictionaries:
+                dictionary = dictionaries[column]
+                codes, uniques = pd.factorize(chunk[column])
+                # Translate this chunk's codes into the column-wide dictionary, adding new strings
+                mapping = np.array([dictionary.setdefault(value, len(dictionary)) for value in uniques] + [-1],
+                                   dtype=CODE_DTYPE)
+                array[start:stop] = mapping[codes]
+            else:
+                array[start:stop] = chunk[column].to_numpy(dtype=array.dtype)
+        start = stop
+
+    for entry in columns:
+        arrays[entry['name']].flush()
+        if entry['kind'] == 'category':
+            with open(os.path.join(store_dir, entry['categories']), 'w') as handle:
+                json.dump(list(dictionaries[entry['name']]), handle)
+    meta = {'source': file_fingerprint(file_path), 'n_rows': n_rows, 'columns': columns}
+    # The metadata is written last, so an interrupted build is never mistaken for a complete store
+    with open(os.path.join(store_dir, META_FILE), 'w') as handle:
+        json.dump(meta, handle, indent=2)
+    return ColumnStore(store_dir)
+
+
+def open_column_store(file_path, store_dir=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Open the column store of a CSV, building it first if it is missing or the file has changed."""
+    store_dir = store_dir or default_store_dir(file_path)
+    try:
+        with open(os.path.join(store_dir, META_FILE)) as handle:
+            source = json.load(handle)['source']
+        if source == file_fingerprint(file_path):
+            return ColumnStore(store_dir)
+    except (OSError, ValueError, KeyError):
+        pass
+    print(f"Building column store for {file_path} in: {store_dir}")
+    return build_column_store(file_path, store_dir, chunksize)
+
+
+class ColumnStore:
+    """Read-only, column-oriented view of a dataset kept in memory-mapped files.
+
+    It supports the parts of the DataFrame interface the analyses use: columns, dtypes, len() and
+    indexing by a column name (a Series) or a list of names (a DataFrame). Only the columns that are
+    indexed are paged in from disk.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, META_FILE)) as handle:
+            meta = json.load(handle)
+        self.n_rows = meta['n_rows']
+        # file_fingerprint of the CSV the store was built from
+        self.source = meta.get('source')
+        self._entries = {entry['name']: entry for entry in meta['columns']}
+        self._categories = {}
+        self.columns = pd.Index([entry['name'] for entry in meta['columns']])
+
+    def __len__(self):
+        return self.n_rows
+
+    def __contains__(self, column):
+        return column in self._entries
+
+    @property
+    def shape(self):
+        return self.n_rows, len(self.columns)
+
+    def categories(self, column):
+        """Return the dictionary of a categorical column, loading it once."""
+        if column not in self._categories:
+            with open(os.path.join(self.store_dir, self._entries[column]['categories'])) as handle:
+                self._categories[column] = pd.Index(json.load(handle), dtype=object)
+        return self._categories[column]
+
+    @property
+    def dtypes(self):
+        dtypes = {}
+        for column, entry in self._entries.items():
+            if entry['kind'] == 'category':
+                dtypes[column] = pd.CategoricalDtype(self.categories(column))
+            else:
+                dtypes[column] = np.dtype(entry['dtype'])
+        return pd.Series(dtypes, dtype=object)
+
+    def array(self, column):
+        """Return the raw memory-mapped array of a column: values, or codes for a categorical column."""
+        if column not in self._entries:
+            raise KeyError(column)
+        return np.load(os.path.join(self.store_dir, self._entries[column]['file']), mmap_mode='r')
+
+    def __getitem__(self, key):
+        if isinstance(key, (list, tuple, pd.Index)):
+            return pd.DataFrame({column: self[column] for column in key})
+        data = self.array(key)
+        if self._entries[key]['kind'] == 'category':
+            data = pd.Categorical.from_codes(data, dtype=pd.CategoricalDtype(self.categories(key)))
+        return pd.Series(data, name=key, copy=False)
+
+    def head(self, n=5):
+        return pd.DataFrame({column: self[column][:n] for column in self.columns})
+
+    def to_dataframe(self, columns=None):
+        """Load the given columns (default: all) into an in-memory DataFrame."""
+        return self[list(self.columns if columns is None else columns)]
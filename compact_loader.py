@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+DEFAULT_CHUNKSIZE = 100_000
+SAMPLE_ROWS = 10_000
+# A text column is stored as categorical codes when at most this share of the sample is distinct
+CATEGORY_RATIO = 0.5
+
+
+def infer_schema(file_path, sample_rows=SAMPLE_ROWS, category_ratio=CATEGORY_RATIO):
+    """Infer a storage kind ('numeric', 'category' or 'text') per column from a sample of rows."""
+    sample = pd.read_csv(file_path, nrows=sample_rows)
+    schema = {}
+    for column in sample.columns:
+        series = sample[column]
+        if pd.api.types.is_numeric_dtype(series):
+            schema[column] = 'numeric'
+        else:
+            non_null = series.count()
+            if series.nunique() <= max(1, non_null * category_ratio):
+                schema[column] = 'category'
+            else:
+                schema[column] = 'text'
+    return schema
+
+
+def shrink_numeric(series):
+    """Return the series stored in the smallest numeric dtype that holds every value exactly."""
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return series
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy()
+        finite = values[~np.isnan(values)]
+        if len(finite) == len(values) and np.array_equal(finite, np.round(finite)) and (
+                len(finite) == 0 or np.abs(finite).max() < 2 ** 53):
+            return pd.to_numeric(series.astype(np.int64), downcast='integer')
+        narrowed = values.astype(np.float32)
+        # Only a lossless round trip narrows the column; most decimal data stays float64
+        if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+            return pd.Series(narrowed, index=series.index, name=series.name)
+        return series
+    return pd.to_numeric(series, downcast='integer')
+
+
+def compact_chunk(chunk, schema):
+    """Convert one parsed chunk to compact dtypes following the inferred schema."""
+    for column in chunk.columns:
+        kind = schema.get(column, 'text')
+        if kind == 'category':
+            chunk[column] = chunk[column].astype('category')
+        elif kind == 'numeric':
+            chunk[column] = shrink_numeric(chunk[column])
+    return chunk
+
+
+def read_csv_compact(file_path, chunksize=DEFAULT_CHUNKSIZE, sample_rows=SAMPLE_ROWS,
+                     category_ratio=CATEGORY_RATIO, report=True):
+    """Read a CSV in chunks, storing low-cardinality text as categories and numbers in the smallest safe width."""
+    schema = infer_schema(file_path, sample_rows=sample_rows, category_ratio=category_ratio)
+    # Text columns are always parsed as text, so a chunk of digit-only labels cannot change their type
+    text_dtypes = {column: str for column, kind in schema.items() if kind != 'numeric'}
+
+    pieces = {column: [] for column in schema}
+    raw_bytes = 0
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, dtype=text_dtypes):
+        raw_bytes += chunk.memory_usage(deep=True).sum()
+        chunk = compact_chunk(chunk, schema)
+        for column in schema:
+            pieces[column].append(chunk[column])
+
+    columns = {}
+    for column, parts in pieces.items():
+        if not parts:
+            columns[column] = pd.Series(dtype=object, name=column)
+        elif schema[column] == 'category':
+            columns[column] = pd.Series(union_categoricals(parts, sort_categories=True), name=column)
+        else:
+            combined = pd.concat(parts, ignore_index=True)
+            # Chunks may have been narrowed differently, so shrink the combined column once more
+            columns[column] = shrink_numeric(combined) if schema[column] == 'numeric' else combined
+        pieces[column] = None
+    data = pd.DataFrame(columns)
+
+    if report:
+        print_memory_report(data, raw_bytes)
+    return data
+
+
+def print_memory_report(data, raw_bytes=None):
+    """Print the storage type and memory footprint of every column."""
+    usage = data.memory_usage(deep=True, index=False)
+    print("\nMemory report:")
+    print(f"{'Variable':<20}{'Storage':<15}{'Memory (KB)':>12}")
+    print("-" * 47)
+    for column in data.columns:
+        print(f"{column:<20}{str(data[column].dtype):<15}{usage[column] / 1024:>12.1f}")
+    print("-" * 47)
+    total = usage.sum()
+    print(f"{'Total':<35}{total / 1024:>12.1f}")
+    if raw_bytes:
+        saved = 100 * (1 - total / raw_bytes)
+        print(f"Default dtypes would use {raw_bytes / 1024 ** 2:.2f} MB; "
+              f"compact frame uses {total / 1024 ** 2:.2f} MB ({saved:.1f}% smaller).")
@@ -1,11 +1,82 @@
-import scipy.stats as stats
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
+from column_profiler import profile_columns
+from group_statistics import anova_f, factorize_groups, group_moments, one_way_test, screen_groups
+from instrumentation import span, traced
+from normality import normality_test, plot_qq, profile_moments, qq_points
+from resampling import DEFAULT_RESAMPLES, permutation_test
+from result_cache import memoize
 
-def conduct_anova(dataset):
+
+def choose_one_way_test(values, moments=None):
+    """Return the test suited to a continuous column and the p-value of its normality check."""
+    normality = normality_test(values, moments=moments)
+    return ('ANOVA' if normality['normal'] else 'Kruskal-Wallis'), normality['p_value']
+
+
+@traced()
+def run_permutation_anova(dataset, cont_var, cat_var, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1):
+    """Compare a continuous variable across categories with a permutation test of the F statistic."""
+    values = np.asarray(dataset[cont_var], dtype=np.float64)
+    codes, labels = factorize_groups(dataset[cat_var])
+    valid = ~np.isnan(values) & (codes >= 0)
+    # Renumber the groups that actually occur as 0 .. k-1
+    present, dense_codes = np.unique(codes[valid], return_inverse=True)
+    f_stat, df_between, df_within = anova_f(*group_moments(values[valid], dense_codes, len(present)))
+    permutation = permutation_test(values[valid], dense_codes, n_resamples, seed, workers)
+    return {
+        'analysis': 'anova',
+        'variables': [cont_var, cat_var],
+        'test': 'Permutation ANOVA',
+        'statistic': float(f_stat),
+        'p_value': permutation['p_value'],
+        'n_resamples': permutation['n_resamples'],
+        'significant': bool(permutation['p_value'] < 0.05),
+    }
+
+
+@traced()
+def run_anova(dataset, cont_var, cat_var, method='auto', moments=None, **options):
+    """Compare a continuous variable across categories with ANOVA, or Kruskal-Wallis if it is not normal.
+
+    moments, the streaming moments of cont_var from its profile, are reused by the normality check.
+    method='permutation' runs run_permutation_anova instead, passing options through.
+    """
+    if method == 'permutation':
+        return run_permutation_anova(dataset, cont_var, cat_var, **options)
+    values = np.asarray(dataset[cont_var], dtype=np.float64)
+    with span('anova.normality'):
+        test, normality_p_value = choose_one_way_test(values, moments)
+    # Group statistics come from bincounts over the factorized grouping column
+    with span('anova.group_codes'):
+        codes, labels = factorize_groups(dataset[cat_var])
+    with span('anova.test', test=test):
+        statistic, p_value = one_way_test(values, codes, len(labels), test)
+
+    return {
+        'analysis': 'anova',
+        'variables': [cont_var, cat_var],
+        'test': test,
+        'statistic': float(statistic),
+        'p_value': float(p_value),
+        'normality_p_value': float(normality_p_value),
+        'significant': bool(p_value < 0.05),
+    }
+
+
+@traced()
+def screen_anova(dataset, cont_vars, cat_vars):
+    """Run ANOVA or Kruskal-Wallis for every continuous x categorical combination, sorted by p-value."""
+    return screen_groups(dataset, cont_vars, cat_vars, lambda values: choose_one_way_test(values)[0])
+
+
+@traced()
+def conduct_anova(dataset, profile=None, results=None):
     if dataset is not None:
+        if profile is None:
+            profile = profile_columns(dataset)
+
         # Step 1: Display variables
         print("\nFor ANOVA, following are the variables available:")
         print(f"{'Variable':<20}{'Type':<15}")
@@ -13,18 +84,26 @@ def conduct_anova(dataset):
         categorical_vars = []
         continuous_vars = []
 
-        for column in dataset.columns:
-            dtype = str(dataset[column].dtype)
-            if dtype == 'object' or dataset[column].nunique() <= 10:
-                var_type = 'Categorical'
+        for column, var_type in profile['analysis_type'].items():
+            if var_type == 'Categorical':
                 categorical_vars.append(column)
             else:
-                var_type = 'Continuous'
                 continuous_vars.append(column)
             print(f"{column:<20}{var_type:<15}")
 
-        # Step 2: Get continuous and categorical variables from user
+        # Step 2: Test one combination, or screen every continuous x categorical combination
         if continuous_vars and categorical_vars:
+            mode = input("Enter 1 to test one pair of variables or 2 to screen all combinations: ")
+            if mode == '2':
+                print(f"\nPerforming ANOVA / Kruskal-Wallis over all {len(continuous_vars) * len(categorical_vars)} combinations…")
+                screen = memoize(results, 'screen_anova', {'cont_vars': continuous_vars, 'cat_vars': categorical_vars},
+                                 lambda: screen_anova(dataset, continuous_vars, categorical_vars))
+                with pd.option_context('display.width', 200, 'display.max_columns', None):
+                    print(screen.head(20).to_string(index=False))
+                significant = int((screen['p_value'] < 0.05).sum())
+                print(f"{significant} of {len(screen)} combinations show a statistically significant difference.")
+                return
+
             while True:
                 cont_var = input("Enter a continuous (interval/ratio) variable: ")
                 if cont_var in continuous_vars:
@@ -39,43 +118,45 @@ def conduct_anova(dataset):
 
             print(f"\nPerforming ANOVA over the selected variables: {cont_var} and {cat_var}…")
 
-            # Step 3: Check normality of continuous variable
-            stat, p_value = stats.shapiro(dataset[cont_var])
-            if p_value < 0.05:
-                print(f"‘{cont_var}’ is not normally distributed, as shown in the Q-Q plot…")
-                # Plot Q-Q plot
-                plt.figure(figsize=(6, 4))
-                stats.probplot(dataset[cont_var], dist="norm", plot=plt)
-                plt.title(f"Q-Q plot for {cont_var}")
-                plt.show()
-
-                print(f"Performing Kruskal-Wallis Test instead of ANOVA…")
-                # Step 4: Perform Kruskal-Wallis Test
-                groups = [group[cont_var].dropna() for name, group in dataset.groupby(cat_var)]
-                kruskal_stat, kruskal_p_value = stats.kruskal(*groups)
-
-                print(
-                    f"Kruskal-Wallis Result:\nKruskal-Wallis Statistic: {kruskal_stat:.6f}\np-value: {kruskal_p_value:.6f}")
-                if kruskal_p_value < 0.05:
+            method = input("Enter 1 for the standard test or 2 for a permutation test: ")
+            if method == '2':
+                print(f"Performing permutation ANOVA with {DEFAULT_RESAMPLES} resamples…")
+                result = memoize(results, 'anova', {'cont_var': cont_var, 'cat_var': cat_var, 'method': 'permutation'},
+                                 lambda: run_anova(dataset, cont_var, cat_var, method='permutation'))
+                print(f"Permutation ANOVA Result:\nF-statistic: {result['statistic']:.6f}\n"
+                      f"p-value: {result['p_value']:.6f} ({result['n_resamples']} resamples)")
+                if result['significant']:
                     print("Result is statistically significant.")
                     print(
                         f"There is a statistically significant difference in the average ‘{cont_var}’ across the categories of ‘{cat_var}’.")
                 else:
                     print("Result is not statistically significant.")
+                return
+
+            # Step 3: Check normality and run ANOVA or Kruskal-Wallis
+            result = memoize(results, 'anova', {'cont_var': cont_var, 'cat_var': cat_var, 'method': 'auto'},
+                             lambda: run_anova(dataset, cont_var, cat_var,
+                                               moments=profile_moments(profile, cont_var)))
+            if result['test'] == 'Kruskal-Wallis':
+                print(f"‘{cont_var}’ is not normally distributed, as shown in the Q-Q plot…")
+                # Plot Q-Q plot
+                points = memoize(results, 'qq_points', {'variable': cont_var}, lambda: qq_points(dataset[cont_var]))
+                plot_qq(dataset[cont_var], title=f"Q-Q plot for {cont_var}", points=points)
+
+                print(f"Performing Kruskal-Wallis Test instead of ANOVA…")
+                print(
+                    f"Kruskal-Wallis Result:\nKruskal-Wallis Statistic: {result['statistic']:.6f}\np-value: {result['p_value']:.6f}")
             else:
                 print(f"‘{cont_var}’ is normally distributed. Performing ANOVA…")
+                print(f"ANOVA Result:\nF-statistic: {result['statistic']:.6f}\np-value: {result['p_value']:.6f}")
 
-                # Step 5: Perform ANOVA
-                model = stats.f_oneway(
-                    *[dataset[dataset[cat_var] == group][cont_var] for group in dataset[cat_var].unique()])
-
-                print(f"ANOVA Result:\nF-statistic: {model.statistic:.6f}\np-value: {model.pvalue:.6f}")
-                if model.pvalue < 0.05:
-                    print("Result is statistically significant.")
-                    print(
-                        f"There is a statistically significant difference in the average ‘{cont_var}’ across the categories of ‘{cat_var}’.")
-                else:
-                    print("Result is not statistically significant.")
+            # Step 4: Report significance
+            if result['significant']:
+                print("Result is statistically significant.")
+                print(
+                    f"There is a statistically significant difference in the average ‘{cont_var}’ across the categories of ‘{cat_var}’.")
+            else:
+                print("Result is not statistically significant.")
         else:
             print(
                 "No appropriate variables found for ANOVA. Ensure the dataset contains both categorical and continuous variables.")
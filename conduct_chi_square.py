@@ -1,8 +1,196 @@
+import numpy as np
 import scipy.stats as stats
 import pandas as pd
 
-def conduct_chi_square(dataset):
+from column_profiler import profile_columns
+from instrumentation import span, traced
+from result_cache import memoize
+
+
+@traced()
+def run_chi_square(dataset, var1, var2):
+    """Test the association between two categorical variables with a Chi-Square test."""
+    # Create a contingency table
+    with span('chi_square.contingency_table'):
+        contingency_table = pd.crosstab(dataset[var1], dataset[var2])
+
+    with span('chi_square.test'):
+        chi2_stat, p_value, dof, expected = stats.chi2_contingency(contingency_table)
+    return {
+        'analysis': 'chi_square',
+        'variables': [var1, var2],
+        'test': 'Chi-Square',
+        'statistic': float(chi2_stat),
+        'p_value': float(p_value),
+        'dof': int(dof),
+        'expected': expected,
+        'significant': bool(p_value < 0.05),
+    }
+
+
+# Upper bound on the cells of one joint count table; keeps the bincount target cache-resident
+MAX_JOINT_CELLS = 2 ** 18
+
+
+def _factorize(series):
+    """Return integer codes and the number of codes, with missing values mapped to an extra last code."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy().astype(np.intp)
+        n_levels = len(series.cat.categories)
+    else:
+        codes, labels = pd.factorize(series)
+        codes = codes.astype(np.intp, copy=False)
+        n_levels = len(labels)
+    missing = codes < 0
+    if missing.any():
+        codes[missing] = n_levels
+        return codes, n_levels, n_levels + 1
+    return codes, n_levels, n_levels
+
+
+def _pack_columns(factorized, columns, pack_limit):
+    """Greedily group columns so the product of their code counts stays within pack_limit."""
+    packs = []
+    current, size = [], 1
+    for column in columns:
+        n_codes = factorized[column][2]
+        if current and size * n_codes > pack_limit:
+            packs.append(current)
+            current, size = [], 1
+        current.append(column)
+        size *= n_codes
+    if current:
+        packs.append(current)
+    return packs
+
+
+def _chi_square_from_table(observed, correction=True):
+    """Return (chi2, corrected chi2, dof, n, min(r, c) - 1) for a contingency table of counts."""
+    # Levels that never occur in this pair carry no information and would give zero expected counts
+    observed = observed[observed.sum(axis=1) > 0][:, observed.sum(axis=0) > 0]
+    n = observed.sum()
+    rows, cols = observed.shape
+    dof = (rows - 1) * (cols - 1)
+    if dof == 0:
+        return 0.0, 0.0, 0, n, 0
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / n
+    diff = observed - expected
+    chi2 = (diff * diff / expected).sum()
+    corrected = chi2
+    if correction and dof == 1:
+        # Yates' continuity correction, as applied by scipy's chi2_contingency
+        adjusted = np.maximum(np.abs(diff) - 0.5, 0)
+        corrected = (adjusted * adjusted / expected).sum()
+    return chi2, corrected, dof, n, min(rows, cols) - 1
+
+
+def _chi_square_sparse(codes1, n_levels1, codes2, n_levels2, correction=True):
+    """Return what _chi_square_from_table returns for two code arrays, counting only the cells that occur.
+
+    With r and c the row and column totals, chi2 = n * sum(O² / (r * c)) - n over the non-empty cells,
+    so memory grows with the rows rather than with the product of the numbers of levels.
+    """
+    complete = (codes1 < n_levels1) & (codes2 < n_levels2)
+    codes1, codes2 = codes1[complete], codes2[complete]
+    n = len(codes1)
+    row_totals = np.bincount(codes1, minlength=n_levels1)
+    col_totals = np.bincount(codes2, minlength=n_levels2)
+    rows, cols = np.count_nonzero(row_totals), np.count_nonzero(col_totals)
+    if rows == 2 and cols == 2:
+        # A 2 x 2 table is small enough to count densely, with Yates' correction
+        observed = np.bincount(codes1 * n_levels2 + codes2, minlength=n_levels1 * n_levels2)
+        return _chi_square_from_table(observed.reshape(n_levels1, n_levels2), correction)
+    dof = (rows - 1) * (cols - 1)
+    if dof <= 0:
+        return 0.0, 0.0, 0, n, 0
+    cells, counts = np.unique(codes1.astype(np.int64) * n_levels2 + codes2, return_counts=True)
+    counts = counts.astype(np.float64)
+    expected_shares = row_totals[cells // n_levels2] * col_totals[cells % n_levels2].astype(np.float64)
+    chi2 = n * (counts * counts / expected_shares).sum() - n
+    return chi2, chi2, dof, n, min(rows, cols) - 1
+
+
+@traced()
+def chi_square_all_pairs(dataset, columns, correction=True):
+    """Run a Chi-Square test on every pair of columns and return (Cramér's V matrix, ranked results).
+
+    Pairs whose joint table would exceed the cell budget, such as two high-cardinality text columns,
+    are counted one pair at a time over the cells that occur.
+    """
+    # Factorize each column once, then pack a few columns into one integer code so that a single
+    # bincount over two packs yields the joint table from which every pair's contingency table is summed
+    factorized = {column: _factorize(dataset[column]) for column in columns}
+    n_rows = len(dataset)
+    cell_budget = min(MAX_JOINT_CELLS, max(n_rows // 4, 64))
+    packs = _pack_columns(factorized, columns, max(int(np.sqrt(cell_budget)), 2))
+
+    pack_codes = []
+    for pack in packs:
+        code = np.zeros(n_rows, dtype=np.intp)
+        for column in pack:
+            code *= factorized[column][2]
+            code += factorized[column][0]
+        pack_codes.append((code, [factorized[column][2] for column in pack]))
+
+    records = []
+    for p, pack1 in enumerate(packs):
+        code1, dims1 = pack_codes[p]
+        for q in range(p, len(packs)):
+            pack2 = packs[q]
+            code2, dims2 = pack_codes[q]
+            size1, size2 = int(np.prod(dims1)), int(np.prod(dims2))
+            if p != q and size1 * size2 > cell_budget:
+                # A column with more levels than a pack holds is a pack of its own; its joint table with
+                # another pack could need more memory than the data, so count its pairs sparsely
+                for var1 in pack1:
+                    for var2 in pack2:
+                        codes1, n_levels1, _ = factorized[var1]
+                        codes2, n_levels2, _ = factorized[var2]
+                        chi2, corrected, dof, n, min_dim = _chi_square_sparse(codes1, n_levels1, codes2,
+                                                                              n_levels2, correction)
+                        cramers_v = np.sqrt(chi2 / (n * min_dim)) if min_dim > 0 and n > 0 else 0.0
+                        records.append((var1, var2, corrected, dof, n, cramers_v))
+                continue
+            if p == q:
+                joint = np.bincount(code1, minlength=size1).reshape(dims1)
+                pairs = [(a, b) for a in range(len(pack1)) for b in range(a + 1, len(pack1))]
+                axes = len(dims1)
+            else:
+                joint = np.bincount(code1 * size2 + code2, minlength=size1 * size2)
+                joint = joint.reshape(dims1 + dims2)
+                pairs = [(a, len(pack1) + b) for a in range(len(pack1)) for b in range(len(pack2))]
+                axes = len(dims1) + len(dims2)
+            names = pack1 + pack2 if p != q else pack1
+
+            for a, b in pairs:
+                others = tuple(axis for axis in range(axes) if axis not in (a, b))
+                table = joint.sum(axis=others) if others else joint
+                var1, var2 = names[a], names[b]
+                # Drop the trailing missing-value code so only complete pairs are counted
+                observed = table[:factorized[var1][1], :factorized[var2][1]]
+                chi2, corrected, dof, n, min_dim = _chi_square_from_table(observed, correction)
+                cramers_v = np.sqrt(chi2 / (n * min_dim)) if min_dim > 0 and n > 0 else 0.0
+                records.append((var1, var2, corrected, dof, n, cramers_v))
+
+    results = pd.DataFrame(records, columns=['var1', 'var2', 'chi2', 'dof', 'n', 'cramers_v'])
+    results['p_value'] = stats.chi2.sf(results['chi2'], results['dof'])
+    results.loc[results['dof'] == 0, 'p_value'] = 1.0
+    results = results[['var1', 'var2', 'chi2', 'dof', 'p_value', 'cramers_v', 'n']]
+    results = results.sort_values(['p_value', 'cramers_v'], ascending=[True, False], ignore_index=True)
+
+    matrix = pd.DataFrame(np.eye(len(columns)), index=columns, columns=columns)
+    for row in results.itertuples(index=False):
+        matrix.loc[row.var1, row.var2] = row.cramers_v
+        matrix.loc[row.var2, row.var1] = row.cramers_v
+    return matrix, results
+
+
+@traced()
+def conduct_chi_square(dataset, profile=None, results=None):
     if dataset is not None:
+        if profile is None:
+            profile = profile_columns(dataset)
+
         # Step 1: Display variables
         print("\nFor Chi-Square test, following are the variables available:")
         print(f"{'Variable':<20}{'Type':<15}")
@@ -10,13 +198,24 @@ def conduct_chi_square(dataset):
 
         categorical_vars = []
 
-        for column in dataset.columns:
-            if dataset[column].dtype == 'object' or dataset[column].nunique() <= 10:
-                print(f"{column:<20}{'Categorical':<15}")
-                categorical_vars.append(column)
+        for column in profile.index[profile['analysis_type'] == 'Categorical']:
+            print(f"{column:<20}{'Categorical':<15}")
+            categorical_vars.append(column)
 
-        # Step 2: Get two categorical variables from user
+        # Step 2: Test one pair, or screen every pair of categorical variables
         if len(categorical_vars) >= 2:
+            mode = input("Enter 1 to test one pair of variables or 2 to screen all pairs: ")
+            if mode == '2':
+                print(f"\nPerforming Chi-Square tests over all {len(categorical_vars)} categorical variables…")
+                matrix, pairs = memoize(results, 'chi_square_all_pairs', {'columns': categorical_vars},
+                                        lambda: chi_square_all_pairs(dataset, categorical_vars))
+                with pd.option_context('display.width', 200, 'display.max_columns', None):
+                    print("Cramér's V association matrix:\n", matrix.round(3))
+                    print("\nPairs ranked by significance:\n", pairs.head(20).to_string(index=False))
+                significant = int((pairs['p_value'] < 0.05).sum())
+                print(f"{significant} of {len(pairs)} pairs show a statistically significant association.")
+                return
+
             while True:
                 var1 = input("Enter the first categorical variable: ")
                 if var1 in categorical_vars:
@@ -31,16 +230,15 @@ def conduct_chi_square(dataset):
 
             print(f"\nPerforming Chi-Square test over the selected variables: {var1} and {var2}…")
 
-            # Step 3: Create a contingency table
-            contingency_table = pd.crosstab(dataset[var1], dataset[var2])
-
-            # Step 4: Perform Chi-Square test
-            chi2_stat, p_value, dof, expected = stats.chi2_contingency(contingency_table)
+            # Step 3: Build the contingency table and perform Chi-Square test
+            result = memoize(results, 'chi_square', {'var1': var1, 'var2': var2},
+                             lambda: run_chi_square(dataset, var1, var2))
 
-            print(f"Chi-Square Test Result:\nChi-Square Statistic: {chi2_stat:.6f}\np-value: {p_value:.6f}\nDegrees of Freedom: {dof}")
-            print("Expected frequencies:\n", expected)
+            with span('chi_square.print_results'):
+                print(f"Chi-Square Test Result:\nChi-Square Statistic: {result['statistic']:.6f}\np-value: {result['p_value']:.6f}\nDegrees of Freedom: {result['dof']}")
+                print("Expected frequencies:\n", result['expected'])
 
-            if p_value < 0.05:
+            if result['significant']:
                 print("Result is statistically significant.")
                 print(f"There is a statistically significant association between ‘{var1}’ and ‘{var2}’.")
             else:
@@ -0,0 +1,246 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+from column_profiler import profile_columns
+from group_statistics import average_ranks
+from instrumentation import span, traced
+from regression_engine import block_cross_products, column_matrix
+from result_cache import memoize
+
+# Memory allowed for the pair of column blocks being correlated, their masks and temporaries, whatever
+# the number of rows or columns
+BLOCK_BUDGET_BYTES = 512 * 1024 ** 2
+# Row-length float64 arrays alive per column of a block at the peak (measured): the block, its ranks,
+# its filled copy and indicator, the squared values and the missing-value masks
+ARRAYS_PER_COLUMN = 6
+# Widest block, which bounds the (block x block) products when there are few rows
+MAX_BLOCK_SIZE = 512
+# Largest matrix printed, and largest drawn as a heatmap, in the interactive analysis
+MAX_DISPLAY_COLUMNS = 25
+MAX_HEATMAP_COLUMNS = 60
+# Pairs listed by the interactive analysis
+TOP_PAIRS = 20
+METHODS = ('pearson', 'spearman')
+
+
+def _prepared_block(dataset, columns, method):
+    """Read a block of columns and return their centered values (Pearson) or centered ranks (Spearman).
+
+    NaN marks a missing value. Ranking and centering are per column, so a block is prepared on its own.
+    """
+    block = column_matrix(dataset, columns)
+    if method == 'spearman':
+        # Each column is ranked over its own present values
+        block = np.asfortranarray(average_ranks(block)[0])
+    counts = (~np.isnan(block)).sum(axis=0)
+    block -= np.where(np.isnan(block), 0.0, block).sum(axis=0) / np.maximum(counts, 1)
+    return block
+
+
+def block_size_for(n_rows, budget=BLOCK_BUDGET_BYTES):
+    """Return the columns per block that keep two blocks of n_rows rows within budget bytes."""
+    per_column = 2 * ARRAYS_PER_COLUMN * 8 * max(n_rows, 1)
+    return int(min(MAX_BLOCK_SIZE, max(1, budget // per_column)))
+
+
+def correlation_p_values(r, counts):
+    """Return two-sided p-values of correlation coefficients from the t distribution with n - 2 df."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        df = counts - 2
+        t_stat = r * np.sqrt(df / np.clip(1 - r * r, 0, None))
+        p_values = 2 * stats.t.sf(np.abs(t_stat), df)
+    return np.where(counts > 2, p_values, np.nan)
+
+
+def correlation_blocks(dataset, columns, method='pearson', block_size=None):
+    """Yield (row_slice, column_slice, r, counts) for every block on or above the diagonal of the matrix.
+
+    Blocks are read, ranked and centered on demand, so at most two blocks of block_size columns are
+    held at a time; the price is that each block is read again for every row block above it. By
+    default block_size is derived from BLOCK_BUDGET_BYTES and the number of rows.
+    Missing values are handled pairwise: each coefficient uses the rows where both columns are present.
+    For Spearman the ranks are computed per column over its present values, so with missing values
+    they are not re-ranked for each pair (the coefficient is exact when no values are missing).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'. Choose from: {', '.join(METHODS)}.")
+    columns = list(columns)
+    n_columns = len(columns)
+    block_size = block_size or block_size_for(len(dataset))
+    for start in range(0, n_columns, block_size):
+        rows = slice(start, min(start + block_size, n_columns))
+        with span('correlation.prepare_block'):
+            first = _prepared_block(dataset, columns[rows], method)
+        for other in range(start, n_columns, block_size):
+            cols = slice(other, min(other + block_size, n_columns))
+            if other == start:
+                second = first
+            else:
+                with span('correlation.prepare_block'):
+                    second = _prepared_block(dataset, columns[cols], method)
+            with span('correlation.block'):
+                counts, cross_products, first_squares, second_squares = block_cross_products(first, second)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    r = np.clip(cross_products / np.sqrt(first_squares * second_squares), -1.0, 1.0)
+            yield rows, cols, r, counts
+
+
+@traced()
+def correlation_matrix(dataset, columns, method='pearson', block_size=None):
+    """Return the correlation matrix, its p-values and the pairwise observation counts as DataFrames."""
+    columns = list(columns)
+    n_columns = len(columns)
+    r = np.full((n_columns, n_columns), np.nan)
+    counts = np.zeros((n_columns, n_columns))
+    for rows, cols, block_r, block_counts in correlation_blocks(dataset, columns, method, block_size):
+        r[rows, cols], counts[rows, cols] = block_r, block_counts
+        r[cols, rows], counts[cols, rows] = block_r.T, block_counts.T
+    p_values = correlation_p_values(r, counts)
+    np.fill_diagonal(p_values, np.nan)
+    frame = lambda values: pd.DataFrame(values, index=columns, columns=columns)
+    return frame(r), frame(p_values), frame(counts.astype(np.int64))
+
+
+def _scan_pairs(dataset, columns, method, k, block_size, alpha):
+    """Return the k strongest pairs, the number of pairs tested and how many have p < alpha, in one pass."""
+    columns = list(columns)
+    best = []
+    n_pairs = n_significant = 0
+    for rows, cols, r, counts in correlation_blocks(dataset, columns, method, block_size):
+        i, j = np.indices(r.shape)
+        # Only pairs above the diagonal of the full matrix, so each pair is counted once
+        keep = (i + rows.start < j + cols.start) & ~np.isnan(r)
+        i, j, block_r, block_counts = i[keep] + rows.start, j[keep] + cols.start, r[keep], counts[keep]
+        n_pairs += len(block_r)
+        n_significant += int((correlation_p_values(block_r, block_counts) < alpha).sum())
+        strength = np.abs(block_r)
+        for position in np.argsort(strength)[::-1][:k]:
+            pair = (strength[position], int(i[position]), int(j[position]), block_r[position], block_counts[position])
+            if len(best) < k:
+                heapq.heappush(best, pair)
+            elif pair[0] > best[0][0]:
+                heapq.heapreplace(best, pair)
+
+    best.sort(reverse=True)
+    table = _pair_table(columns, [pair[1] for pair in best], [pair[2] for pair in best],
+                        np.array([pair[3] for pair in best]), np.array([pair[4] for pair in best]))
+    return table, n_pairs, n_significant
+
+
+def _pair_table(columns, first, second, r, counts):
+    return pd.DataFrame({
+        'var1': [columns[i] for i in first],
+        'var2': [columns[j] for j in second],
+        'n_obs': counts.astype(np.int64),
+        'r': r,
+        'p_value': correlation_p_values(r, counts),
+    })
+
+
+def matrix_pairs(r, p_values, counts, k=TOP_PAIRS, alpha=0.05):
+    """Return what _scan_pairs returns, from the results of correlation_matrix instead of another pass."""
+    first, second = np.triu_indices(len(r), 1)
+    values = r.to_numpy()[first, second]
+    keep = ~np.isnan(values)
+    first, second, values = first[keep], second[keep], values[keep]
+    n_significant = int((p_values.to_numpy()[first, second] < alpha).sum())
+    strongest = np.argsort(-np.abs(values), kind='stable')[:k]
+    table = _pair_table(list(r.columns), first[strongest], second[strongest], values[strongest],
+                        counts.to_numpy()[first[strongest], second[strongest]])
+    return table, len(values), n_significant
+
+
+@traced()
+def top_correlations(dataset, columns, method='pearson', k=TOP_PAIRS, block_size=None):
+    """Return the k pairs with the largest absolute correlation, keeping only k pairs per block in memory."""
+    return _scan_pairs(dataset, columns, method, k, block_size, alpha=0.05)[0]
+
+
+@traced()
+def run_correlation(dataset, var1, var2, method='pearson'):
+    """Correlate two numeric variables over the rows where both are present."""
+    r, p_values, counts = correlation_matrix(dataset, [var1, var2], method)
+    p_value = p_values.loc[var1, var2]
+    return {
+        'analysis': 'correlation',
+        'variables': [var1, var2],
+        'test': 'Pearson' if method == 'pearson' else 'Spearman',
+        'statistic': float(r.loc[var1, var2]),
+        'p_value': float(p_value),
+        'n_obs': int(counts.loc[var1, var2]),
+        'significant': bool(p_value < 0.05),
+    }
+
+
+def plot_correlation_heatmap(r, title=None, output_path=None):
+    """Draw a correlation matrix as a heatmap; save it to output_path, or show it when none is given."""
+    import matplotlib.pyplot as plt
+
+    size = min(4 + 0.3 * len(r), 16)
+    figure, axes = plt.subplots(figsize=(size + 1, size))
+    image = axes.imshow(r.to_numpy(), cmap='coolwarm', vmin=-1, vmax=1)
+    axes.set_xticks(range(len(r.columns)), labels=r.columns, rotation=90)
+    axes.set_yticks(range(len(r.index)), labels=r.index)
+    figure.colorbar(image, ax=axes, label='Correlation')
+    axes.set_title(title or "Correlation matrix")
+    figure.tight_layout()
+    if output_path:
+        figure.savefig(output_path)
+        plt.close(figure)
+    else:
+        plt.show()
+
+
+@traced()
+def conduct_correlation(dataset, profile=None, results=None):
+    if dataset is not None:
+        if profile is None:
+            profile = profile_columns(dataset)
+
+        # Step 1: Display variables
+        print("\nFor Correlation analysis, following are the variables available:")
+        print(f"{'Variable':<20}{'Type':<15}")
+        print("-" * 35)
+
+        numeric_vars = []
+
+        for column in profile.index[profile['kind'] == 'Numerical']:
+            print(f"{column:<20}{'Continuous':<15}")
+            numeric_vars.append(column)
+
+        # Step 2: Choose the coefficient and correlate every pair of numeric variables
+        if len(numeric_vars) >= 2:
+            method = 'spearman' if input("Enter 1 for Pearson or 2 for Spearman (rank) correlation: ") == '2' else 'pearson'
+            name = method.capitalize()
+            print(f"\nComputing {name} correlations for all pairs of {len(numeric_vars)} numeric variables…")
+            # A matrix small enough to draw is computed once and the pairs are ranked from it; beyond that
+            # only the strongest pairs are kept while the blocks are scanned
+            r = None
+            if len(numeric_vars) <= MAX_HEATMAP_COLUMNS:
+                matrices = memoize(results, 'correlation_matrix', {'columns': numeric_vars, 'method': method},
+                                   lambda: correlation_matrix(dataset, numeric_vars, method))
+                r = matrices[0]
+                pairs, n_pairs, significant = matrix_pairs(*matrices)
+            else:
+                pairs, n_pairs, significant = memoize(
+                    results, 'top_correlations', {'columns': numeric_vars, 'method': method, 'k': TOP_PAIRS},
+                    lambda: _scan_pairs(dataset, numeric_vars, method, TOP_PAIRS, None, alpha=0.05))
+
+            # Step 3: Print the matrix, when it is small enough to read, and the most strongly correlated pairs
+            if len(numeric_vars) <= MAX_DISPLAY_COLUMNS:
+                with pd.option_context('display.width', 200, 'display.max_columns', None):
+                    print(f"{name} correlation matrix:\n", r.round(3))
+            with pd.option_context('display.width', 200, 'display.max_columns', None):
+                print("\nPairs ranked by strength of correlation:\n", pairs.to_string(index=False))
+            print(f"{significant} of {n_pairs} pairs show a statistically significant correlation.")
+
+            # Step 4: Show the heatmap
+            if r is not None:
+                plot_correlation_heatmap(r, title=f"{name} correlation matrix")
+        else:
+            print("Not enough numeric variables found for Correlation analysis.")
+    else:
+        print("Dataset is not available for analysis.")
@@ -1,8 +1,71 @@
-import statsmodels.api as sm
 import pandas as pd
 
-def conduct_regression(dataset):
+from column_profiler import profile_columns
+from instrumentation import traced
+from regression_engine import fit_ols, simple_regressions
+from result_cache import memoize
+
+
+@traced()
+def fit_regression(dataset, dep_var, indep_var):
+    """Fit a statsmodels OLS model of dep_var on indep_var (a column or list of columns) with an intercept."""
+    import statsmodels.api as sm
+
+    X = dataset[indep_var]
+    y = dataset[dep_var]
+    X = sm.add_constant(X)  # Adds a constant term to the predictor
+    return sm.OLS(y, X).fit()
+
+
+@traced()
+def run_regression(dataset, dep_var, indep_var):
+    """Fit a simple linear regression and return its key statistics."""
+    model = fit_regression(dataset, dep_var, indep_var)
+    return {
+        'analysis': 'regression',
+        'variables': [dep_var, indep_var],
+        'test': 'OLS',
+        'statistic': float(model.fvalue),
+        'p_value': float(model.f_pvalue),
+        'coefficient': float(model.params[indep_var]),
+        'intercept': float(model.params['const']),
+        'r_squared': float(model.rsquared),
+        'n_obs': int(model.nobs),
+        'significant': bool(model.f_pvalue < 0.05),
+    }
+
+
+@traced()
+def run_multiple_regression(dataset, dep_var, predictors):
+    """Fit a multiple linear regression and return its key statistics."""
+    fit = fit_ols(dataset, dep_var, predictors)
+    return {
+        'analysis': 'multiple_regression',
+        'variables': [dep_var] + list(predictors),
+        'test': 'OLS',
+        'statistic': float(fit['f_statistic']),
+        'p_value': float(fit['f_p_value']),
+        'r_squared': float(fit['r_squared']),
+        'adj_r_squared': float(fit['adj_r_squared']),
+        'n_obs': int(fit['n_obs']),
+        'significant': bool(fit['f_p_value'] < 0.05),
+    }
+
+
+def print_ols_fit(fit):
+    """Print the coefficient table and fit statistics returned by fit_ols."""
+    print(fit['coefficients'].to_string(float_format=lambda value: f"{value:.6g}"))
+    print(f"R-squared: {fit['r_squared']:.4f}   Adj. R-squared: {fit['adj_r_squared']:.4f}")
+    print(f"F-statistic: {fit['f_statistic']:.4f}   Prob (F-statistic): {fit['f_p_value']:.4g}")
+    print(f"No. Observations: {fit['n_obs']}   Df Residuals: {fit['df_resid']}")
+
+
+@traced()
+def conduct_regression(dataset, profile=None, results=None):
     if dataset is not None:
+        if profile is None:
+            profile = profile_columns(dataset)
+
         # Step 1: Display variables
         print("\nFor Regression analysis, following are the variables available:")
         print(f"{'Variable':<20}{'Type':<15}")
@@ -10,13 +73,21 @@ def conduct_regression(dataset):
 
         continuous_vars = []
 
-        for column in dataset.columns:
-            if dataset[column].dtype != 'object':
-                print(f"{column:<20}{'Continuous':<15}")
-                continuous_vars.append(column)
+        for column in profile.index[profile['kind'] == 'Numerical']:
+            print(f"{column:<20}{'Continuous':<15}")
+            continuous_vars.append(column)
 
-        # Step 2: Get dependent and independent variables from user
+        # Step 2: Choose the kind of regression, then the dependent and independent variables
         if len(continuous_vars) >= 2:
+            mode = input("Enter 1 for simple regression, 2 for multiple regression or 3 to screen all pairs: ")
+            if mode == '3':
+                print(f"\nFitting simple regressions for all pairs of {len(continuous_vars)} continuous variables…")
+                pairs = memoize(results, 'simple_regressions', {'variables': continuous_vars},
+                                lambda: simple_regressions(dataset, continuous_vars, continuous_vars))
+                with pd.option_context('display.width', 200, 'display.max_columns', None):
+                    print(pairs.head(20).to_string(index=False))
+                return
+
             while True:
                 dep_var = input("Enter the dependent (response) variable: ")
                 if dep_var in continuous_vars:
@@ -28,6 +99,27 @@ def conduct_regression(dataset):
                 if var != dep_var:
                     print(f"- {var}")
 
+            if mode == '2':
+                while True:
+                    entered = input("Enter the independent (predictor) variables, separated by commas: ")
+                    predictors = [var.strip() for var in entered.split(',') if var.strip()]
+                    if predictors and all(var in continuous_vars and var != dep_var for var in predictors):
+                        break
+                    print("Invalid choice. Please select valid continuous variables different from the dependent variable.")
+
+                print(f"\nPerforming Multiple Linear Regression of '{dep_var}' on {', '.join(predictors)}…")
+                try:
+                    fit = memoize(results, 'fit_ols', {'dep_var': dep_var, 'predictors': predictors},
+                                  lambda: fit_ols(dataset, dep_var, predictors))
+                except ValueError as e:
+                    print(f"Could not fit the model: {e}")
+                    return
+                print_ols_fit(fit)
+                if input("Show the full statsmodels summary? (y/n): ").strip().lower() == 'y':
+                    print(memoize(results, 'regression_summary', {'dep_var': dep_var, 'indep_var': predictors},
+                                  lambda: str(fit_regression(dataset, dep_var, predictors).summary())))
+                return
+
             while True:
                 indep_var = input("Enter the independent (predictor) variable: ")
                 if indep_var in continuous_vars and indep_var != dep_var:
@@ -36,16 +128,12 @@ def conduct_regression(dataset):
 
             print(f"\nPerforming Linear Regression with '{dep_var}' as dependent and '{indep_var}' as independent variable…")
 
-            # Step 3: Prepare the data for regression
-            X = dataset[indep_var]
-            y = dataset[dep_var]
-            X = sm.add_constant(X)  # Adds a constant term to the predictor
-
-            # Step 4: Fit the regression model
-            model = sm.OLS(y, X).fit()
+            # Step 3: Fit the regression model; its summary text is what gets cached
+            summary = memoize(results, 'regression_summary', {'dep_var': dep_var, 'indep_var': indep_var},
+                              lambda: str(fit_regression(dataset, dep_var, indep_var).summary()))
 
-            # Step 5: Print the regression results
-            print(model.summary())
+            # Step 4: Print the regression results
+            print(summary)
         else:
             print("Not enough continuous variables found for Regression analysis.")
     else:
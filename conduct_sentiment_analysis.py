@@ -1,107 +1,219 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from textblob import TextBlob
 
-try:
-    from transformers import pipeline
-except ImportError:
-    pipeline = None
+from instrumentation import span, traced
+from sentiment_cache import package_version
+
+BERT_MODEL = 'nlptown/bert-base-multilingual-uncased-sentiment'
+DEFAULT_BATCH_SIZE = 32
+# Print throughput after this many texts have been scored
+PROGRESS_EVERY = 1000
+
+# Unique texts sent to a worker process per task
+SCORING_CHUNKSIZE = 2000
+# Below this many unique texts, scoring in this process is faster than starting a pool
+PARALLEL_MIN_TEXTS = 5000
+
+# Transformer pipelines loaded in this process, keyed by model name
+_pipelines = {}
+# VADER analyzer of this process, created on first use
+_vader_analyzer = None
+
+
+def get_sentiment_pipeline(model=BERT_MODEL, num_threads=None):
+    """Return the sentiment pipeline for a model, loading it only once per process."""
+    try:
+        from transformers import pipeline
+    except ImportError:
+        raise ImportError("Transformers module is not installed.")
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+    if model not in _pipelines:
+        print(f"Loading sentiment model '{model}'…")
+        _pipelines[model] = pipeline('sentiment-analysis', model=model)
+    return _pipelines[model]
+
+
+def _vader_scores(texts):
+    global _vader_analyzer
+    if _vader_analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        _vader_analyzer = SentimentIntensityAnalyzer()
+    return [_vader_analyzer.polarity_scores(text)['compound'] for text in texts]
+
+
+def _textblob_scores(texts):
+    from textblob import TextBlob
+
+    results = []
+    for text in texts:
+        sentiment = TextBlob(text).sentiment
+        results.append((sentiment.polarity, sentiment.subjectivity))
+    return results
+
+
+def score_in_pool(texts, score_chunk, workers=None):
+    """Score texts in this process, or in chunks across a process pool when there are many."""
+    if workers == 1 or len(texts) < PARALLEL_MIN_TEXTS:
+        return score_chunk(texts)
+
+    chunks = [texts[i:i + SCORING_CHUNKSIZE] for i in range(0, len(texts), SCORING_CHUNKSIZE)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(score_chunk, chunks):
+            results.extend(part)
+    return results
+
+
+@traced()
+def score_unique_texts(data, score_texts, cache=None, scorer=None):
+    """Score each distinct text once and return (per-unique results, row codes into them).
+
+    With a score cache, only texts that the named scorer has not scored before are passed to score_texts.
+    """
+    with span('sentiment.factorize_texts'):
+        codes, uniques = pd.factorize(pd.Series(data), use_na_sentinel=False)
+    texts = list(uniques)
+    if cache is None:
+        return score_texts(texts), codes
+
+    results = cache.lookup(scorer, texts)
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        new_results = score_texts(missing_texts)
+        cache.store(scorer, missing_texts, new_results)
+        for i, result in zip(missing, new_results):
+            results[i] = result
+    return results, codes
 
 
 class SentimentAnalysis:
-    def __init__(self):
+    def __init__(self, cache=None):
         self.df = None
+        # Optional SentimentScoreCache shared by all three scorers
+        self.cache = cache
 
     def load_data(self, path):
         """Load the dataset from the provided path."""
         self.df = pd.read_csv(path)
 
-    def get_text_columns(self):
+    def get_text_columns(self, profile=None):
         """Get the text columns, calculate average length and unique entries."""
-        text_columns = self.df.select_dtypes(include=['object'])  # Select text columns
+        # Select text columns from the dtypes, so only these columns are read
+        text_columns = [col for col, dtype in self.df.dtypes.items()
+                        if dtype == object or isinstance(dtype, pd.CategoricalDtype)]
         column_info = []
 
-        for col in text_columns.columns:
-            avg_len = text_columns[col].apply(len).mean()
-            unique_entries = text_columns[col].nunique()
+        for col in text_columns:
+            avg_len = self.df[col].map(len).astype(float).mean()
+            if profile is not None:
+                unique_entries = profile.loc[col, 'nunique']
+            else:
+                unique_entries = self.df[col].nunique()
             column_info.append([col, avg_len, unique_entries])
 
         return pd.DataFrame(column_info, columns=['Column Name', 'Average Entry Length', 'Unique Entries'])
 
-    def vader_sentiment_analysis(self, data):
-        """Perform sentiment analysis using VADER."""
-        analyzer = SentimentIntensityAnalyzer()
-        scores = []
-        sentiments = []
+    @traced()
+    def vader_sentiment_analysis(self, data, workers=None):
+        """Perform sentiment analysis using VADER, scoring each distinct text once."""
+        scorer = f"vader:{package_version('vaderSentiment')}"
+        unique_scores, codes = score_unique_texts(
+            data, lambda texts: score_in_pool(texts, _vader_scores, workers), self.cache, scorer)
+        unique_sentiments = []
 
-        for text in data:
-            score = analyzer.polarity_scores(text)['compound']
-            scores.append(score)
+        for score in unique_scores:
             if score >= 0.05:
-                sentiments.append('positive')
+                unique_sentiments.append('positive')
             elif score <= -0.05:
-                sentiments.append('negative')
+                unique_sentiments.append('negative')
             else:
-                sentiments.append('neutral')
+                unique_sentiments.append('neutral')
 
+        scores = [unique_scores[code] for code in codes]
+        sentiments = [unique_sentiments[code] for code in codes]
         return scores, sentiments
 
-    def textblob_sentiment_analysis(self, data):
-        """Perform sentiment analysis using TextBlob."""
-        scores = []
-        sentiments = []
-        subjectivity_scores = []
-
-        for text in data:
-            analysis = TextBlob(text)
-            polarity = analysis.sentiment.polarity
-            subjectivity = analysis.sentiment.subjectivity
-            scores.append(polarity)
-            subjectivity_scores.append(subjectivity)
+    @traced()
+    def textblob_sentiment_analysis(self, data, workers=None):
+        """Perform sentiment analysis using TextBlob, scoring each distinct text once."""
+        scorer = f"textblob:{package_version('textblob')}"
+        unique_results, codes = score_unique_texts(
+            data, lambda texts: score_in_pool(texts, _textblob_scores, workers), self.cache, scorer)
+        unique_sentiments = []
 
+        for polarity, subjectivity in unique_results:
             if polarity > 0:
-                sentiments.append('positive')
+                unique_sentiments.append('positive')
             elif polarity == 0:
-                sentiments.append('neutral')
+                unique_sentiments.append('neutral')
             else:
-                sentiments.append('negative')
+                unique_sentiments.append('negative')
 
+        scores = [unique_results[code][0] for code in codes]
+        subjectivity_scores = [unique_results[code][1] for code in codes]
+        sentiments = [unique_sentiments[code] for code in codes]
         return scores, sentiments, subjectivity_scores
 
-    def distilbert_sentiment_analysis(self, data):
-        """Perform sentiment analysis using DistilBERT."""
-        if pipeline is None:
-            raise ImportError("Transformers module is not installed.")
-
-        distilbert_pipeline = pipeline('sentiment-analysis', model='nlptown/bert-base-multilingual-uncased-sentiment')
-        scores = []
-        sentiments = []
-
-        for text in data:
-            result = distilbert_pipeline(text)[0]
-            score = result['score']
-            label = result['label']
-            scores.append(score)
+    @traced()
+    def distilbert_sentiment_analysis(self, data, batch_size=DEFAULT_BATCH_SIZE, num_threads=None):
+        """Perform sentiment analysis using DistilBERT, in padded batches of similar-length distinct texts."""
+        scorer = f"{BERT_MODEL}:{package_version('transformers')}"
+        unique_results, codes = score_unique_texts(
+            data, lambda texts: self._transformer_scores(texts, batch_size, num_threads), self.cache, scorer)
+        unique_sentiments = []
 
+        for score, label in unique_results:
             if label in ['4 stars', '5 stars']:
-                sentiments.append('positive')
+                unique_sentiments.append('positive')
             elif label == '3 stars':
-                sentiments.append('neutral')
+                unique_sentiments.append('neutral')
             else:
-                sentiments.append('negative')
+                unique_sentiments.append('negative')
 
+        scores = [unique_results[code][0] for code in codes]
+        sentiments = [unique_sentiments[code] for code in codes]
         return scores, sentiments
 
-
-def conduct_sentiment_analysis(dataset):
+    def _transformer_scores(self, texts, batch_size, num_threads):
+        """Return (score, label) for each text from the transformer pipeline, reporting throughput."""
+        distilbert_pipeline = get_sentiment_pipeline(BERT_MODEL, num_threads)
+        results = [None] * len(texts)
+
+        # Sorting by length keeps padding inside each batch to a minimum
+        order = sorted(range(len(texts)), key=lambda i: len(str(texts[i])))
+        start = time.perf_counter()
+        next_report = PROGRESS_EVERY
+        for batch_start in range(0, len(order), batch_size):
+            positions = order[batch_start:batch_start + batch_size]
+            outputs = distilbert_pipeline([texts[i] for i in positions], batch_size=batch_size, truncation=True)
+            for i, output in zip(positions, outputs):
+                results[i] = (output['score'], output['label'])
+
+            done = batch_start + len(positions)
+            if done >= next_report or done == len(order):
+                elapsed = time.perf_counter() - start
+                print(f"Scored {done}/{len(order)} texts ({done / max(elapsed, 1e-9):.1f} texts/sec)")
+                next_report = done + PROGRESS_EVERY
+
+        return results
+
+
+@traced()
+def conduct_sentiment_analysis(dataset, profile=None, batch_size=DEFAULT_BATCH_SIZE, num_threads=None,
+                               cache=None):
     """Main function to perform sentiment analysis on the dataset."""
-    sa = SentimentAnalysis()
+    sa = SentimentAnalysis(cache)
 
     # Assume dataset is already loaded into the class
     sa.df = dataset
 
     # Get text columns and display them to the user
-    text_columns_df = sa.get_text_columns()
+    text_columns_df = sa.get_text_columns(profile)
     print("Text columns information:\n", text_columns_df)
 
     # Ask the user which column to analyze
@@ -124,7 +236,7 @@ def conduct_sentiment_analysis(dataset):
         result_df = pd.DataFrame(
             {'Text': sa.df[column_to_analyze], 'Score': scores, 'Sentiment': sentiments, 'Subjectivity': subjectivity})
     elif analysis_choice == '3':
-        scores, sentiments = sa.distilbert_sentiment_analysis(sa.df[column_to_analyze])
+        scores, sentiments = sa.distilbert_sentiment_analysis(sa.df[column_to_analyze], batch_size, num_threads)
         result_df = pd.DataFrame({'Text': sa.df[column_to_analyze], 'Score': scores, 'Sentiment': sentiments})
     else:
         print("Invalid choice.")
@@ -132,6 +244,10 @@ def conduct_sentiment_analysis(dataset):
 
     # Display the results
     print("\nSentiment analysis results:\n", result_df)
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(f"Score cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{cache_stats['entries']} stored scores.")
 
 
 if __name__ == '__main__':
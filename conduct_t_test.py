@@ -1,10 +1,123 @@
+import numpy as np
 import scipy.stats as stats
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-def conduct_t_test(dataset):
+from column_profiler import profile_columns
+from group_statistics import adjust_p_values, average_ranks, factorize_groups, observed_groups, two_group_tests
+from instrumentation import span, traced
+from normality import normality_test
+from resampling import DEFAULT_RESAMPLES, bootstrap_mean_difference, permutation_test
+from result_cache import memoize
+
+
+@traced()
+def run_t_test(dataset, cont_var, cat_var, method='auto', n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1):
+    """Compare a continuous variable between two groups.
+
+    method='auto' runs a t-Test, or Mann-Whitney U if a group is not normal; method='permutation' runs a
+    permutation test on the difference in means with a bootstrap confidence interval.
+    """
+    categories = dataset[cat_var]
+    labels = categories.dropna().unique()
+    if len(labels) != 2:
+        raise ValueError(f"'{cat_var}' must have exactly two categories for a t-Test, found {len(labels)}.")
+    with span('t_test.groups'):
+        values = dataset[cont_var]
+        groups = [values[(categories == label).to_numpy()].dropna() for label in labels]
+
+    if method == 'permutation':
+        values = np.concatenate([group.to_numpy(dtype=np.float64) for group in groups])
+        codes = np.repeat([0, 1], [len(group) for group in groups])
+        permutation = permutation_test(values, codes, n_resamples, seed, workers)
+        interval = bootstrap_mean_difference(groups[0], groups[1], n_resamples, seed, workers)
+        return {
+            'analysis': 't_test',
+            'variables': [cont_var, cat_var],
+            'test': 'Permutation',
+            'statistic': permutation['statistic'],
+            'p_value': permutation['p_value'],
+            'groups': [str(label) for label in labels],
+            'ci_low': interval['ci_low'],
+            'ci_high': interval['ci_high'],
+            'n_resamples': permutation['n_resamples'],
+            'significant': bool(permutation['p_value'] < 0.05),
+        }
+
+    # Check normality of the continuous variable for each group
+    non_normal_groups = []
+    with span('t_test.normality'):
+        for label, group in zip(labels, groups):
+            if not normality_test(group)['normal']:
+                non_normal_groups.append(str(label))
+
+    with span('t_test.test'):
+        if not non_normal_groups:
+            statistic, p_value = stats.ttest_ind(*groups, equal_var=True)
+            test = 't-Test'
+        else:
+            statistic, p_value = stats.mannwhitneyu(groups[0], groups[1])
+            test = 'Mann-Whitney U'
+
+    return {
+        'analysis': 't_test',
+        'variables': [cont_var, cat_var],
+        'test': test,
+        'statistic': float(statistic),
+        'p_value': float(p_value),
+        'non_normal_groups': non_normal_groups,
+        'significant': bool(p_value < 0.05),
+    }
+
+
+def binary_groups(series, name):
+    """Return the group codes and the two labels of a binary variable, ignoring categories with no rows."""
+    codes, labels = observed_groups(*factorize_groups(series))
+    if len(labels) != 2:
+        raise ValueError(f"'{name}' must have exactly two categories, found {len(labels)}.")
+    return codes, labels
+
+
+@traced()
+def screen_t_tests(dataset, cont_vars, binary_vars, test='welch', correction='bh', alpha=0.05):
+    """Compare every continuous variable between the two groups of every binary variable.
+
+    Ranks are computed once for all continuous variables, and group moments and rank sums for all
+    binary variables come from a few matrix products instead of one scipy call per test. test ('welch', 'student'
+    or 'mann_whitney') picks the p_value column, which correction ('bh' or 'holm') adjusts across
+    all tests. Returns one table sorted by p_value.
+    """
+    p_columns = {'welch': 'welch_p', 'student': 'student_p', 'mann_whitney': 'mann_whitney_p'}
+    if test not in p_columns:
+        raise ValueError(f"Unknown test '{test}'. Choose from: {', '.join(p_columns)}.")
+    with span('t_test.screen_ranks'):
+        # Stacked column by column, so each variable stays contiguous for the row-wise rank sort
+        matrix = np.stack([np.asarray(dataset[column], dtype=np.float64) for column in cont_vars]).T
+        ranks = average_ranks(matrix)
+
+    groupings = [binary_groups(dataset[binary_var], binary_var) for binary_var in binary_vars]
+    with span('t_test.screen_tests'):
+        tests = two_group_tests(matrix, np.stack([codes for codes, _ in groupings]), ranks)
+
+    results = pd.DataFrame({
+        'continuous': np.tile(cont_vars, len(binary_vars)),
+        'binary': np.repeat(binary_vars, len(cont_vars)),
+        'group_1': np.repeat([str(labels[0]) for _, labels in groupings], len(cont_vars)),
+        'group_2': np.repeat([str(labels[1]) for _, labels in groupings], len(cont_vars)),
+        **{name: values.ravel() for name, values in tests.items()},
+    })
+    results = results[results['continuous'] != results['binary']].reset_index(drop=True)
+    results['p_value'] = results[p_columns[test]]
+    results['p_adjusted'] = adjust_p_values(results['p_value'], correction)
+    results['significant'] = results['p_adjusted'] < alpha
+    return results.sort_values('p_value', ignore_index=True, na_position='last')
+
+
+@traced()
+def conduct_t_test(dataset, profile=None, results=None):
     if dataset is not None:
+        if profile is None:
+            profile = profile_columns(dataset)
+
         # Step 1: Display variables
         print("\nFor t-Test, following are the variables available:")
         print(f"{'Variable':<20}{'Type':<15}")
@@ -13,18 +126,42 @@ def conduct_t_test(dataset):
         categorical_vars = []
         continuous_vars = []
 
-        for column in dataset.columns:
-            dtype = str(dataset[column].dtype)
-            if dtype == 'object' or dataset[column].nunique() <= 10:
-                var_type = 'Categorical'
+        for column, var_type in profile['analysis_type'].items():
+            if var_type == 'Categorical':
                 categorical_vars.append(column)
             else:
-                var_type = 'Continuous'
                 continuous_vars.append(column)
             print(f"{column:<20}{var_type:<15}")
 
-        # Step 2: Get continuous and categorical variables from user
+        # Step 2: Test one pair, or screen every continuous variable against every binary variable
         if continuous_vars and categorical_vars:
+            mode = input("Enter 1 to test one pair of variables or 2 to screen all combinations: ")
+            if mode == '2':
+                binary_vars = []
+                for column in categorical_vars:
+                    if profile.loc[column, 'nunique'] != 2:
+                        continue
+                    try:
+                        binary_groups(dataset[column], column)
+                        binary_vars.append(column)
+                    except ValueError as e:
+                        print(f"Skipping a variable: {e}")
+                if not binary_vars:
+                    print("No binary categorical variables found for t-Test.")
+                    return
+                print(f"\nPerforming Welch t-Test and Mann-Whitney U over all "
+                      f"{len(continuous_vars) * len(binary_vars)} combinations…")
+                screen = memoize(results, 'screen_t_tests', {'cont_vars': continuous_vars, 'binary_vars': binary_vars},
+                                 lambda: screen_t_tests(dataset, continuous_vars, binary_vars))
+                columns = ['continuous', 'binary', 'mean_1', 'mean_2', 'welch_t', 'welch_p', 'mann_whitney_u',
+                           'mann_whitney_p', 'p_adjusted']
+                with pd.option_context('display.width', 200, 'display.max_columns', None):
+                    print(screen[columns].head(20).to_string(index=False))
+                significant = int(screen['significant'].sum())
+                print(f"{significant} of {len(screen)} combinations show a statistically significant difference "
+                      f"after Benjamini-Hochberg correction.")
+                return
+
             while True:
                 cont_var = input("Enter a continuous (interval/ratio) variable: ")
                 if cont_var in continuous_vars:
@@ -35,7 +172,7 @@ def conduct_t_test(dataset):
                 cat_var = input("Enter a categorical (binary) variable: ")
                 if cat_var in categorical_vars:
                     # Ensure categorical variable has only two unique values
-                    if dataset[cat_var].nunique() == 2:
+                    if profile.loc[cat_var, 'nunique'] == 2:
                         break
                     else:
                         print("Please select a binary categorical variable.")
@@ -44,21 +181,33 @@ def conduct_t_test(dataset):
 
             print(f"\nPerforming t-Test over the selected variables: {cont_var} and {cat_var}…")
 
-            # Step 3: Check normality of the continuous variable for each group
-            groups = [dataset[dataset[cat_var] == group][cont_var].dropna() for group in dataset[cat_var].unique()]
-            normal_distributed = True
-            for group in groups:
-                stat, p_value = stats.shapiro(group)
-                if p_value < 0.05:
-                    print(f"Group with '{cat_var}' value '{group.name}' is not normally distributed.")
-                    normal_distributed = False
+            method = input("Enter 1 for the standard test or 2 for a permutation test: ")
+            if method == '2':
+                print(f"Performing permutation test with {DEFAULT_RESAMPLES} resamples…")
+                result = memoize(results, 't_test', {'cont_var': cont_var, 'cat_var': cat_var, 'method': 'permutation'},
+                                 lambda: run_t_test(dataset, cont_var, cat_var, method='permutation'))
+                first, second = result['groups']
+                print(f"Permutation Test Result:\nDifference in means ({first} - {second}): {result['statistic']:.6f}\n"
+                      f"p-value: {result['p_value']:.6f} ({result['n_resamples']} resamples)\n"
+                      f"95% bootstrap confidence interval: [{result['ci_low']:.6f}, {result['ci_high']:.6f}]")
+                if result['significant']:
+                    print("Result is statistically significant.")
+                    print(f"There is a statistically significant difference in the average ‘{cont_var}’ across the categories of ‘{cat_var}’.")
+                else:
+                    print("Result is not statistically significant.")
+                return
+
+            # Step 3: Check normality per group and run the t-Test or Mann-Whitney U test
+            result = memoize(results, 't_test', {'cont_var': cont_var, 'cat_var': cat_var, 'method': 'auto'},
+                             lambda: run_t_test(dataset, cont_var, cat_var))
+            for label in result['non_normal_groups']:
+                print(f"Group with '{cat_var}' value '{label}' is not normally distributed.")
 
-            if normal_distributed:
+            if result['test'] == 't-Test':
                 print(f"All groups are normally distributed. Performing t-Test…")
-                t_stat, p_value = stats.ttest_ind(*groups, equal_var=True)
-                print(f"t-Test Result:\nt-statistic: {t_stat:.6f}\np-value: {p_value:.6f}")
+                print(f"t-Test Result:\nt-statistic: {result['statistic']:.6f}\np-value: {result['p_value']:.6f}")
 
-                if p_value < 0.05:
+                if result['significant']:
                     print("Result is statistically significant.")
                     print(f"There is a statistically significant difference in the average ‘{cont_var}’ across the categories of ‘{cat_var}’.")
                 else:
@@ -66,10 +215,8 @@ def conduct_t_test(dataset):
             else:
                 print("One or more groups are not normally distributed, consider using a non-parametric test instead.")
                 print(f"Performing Mann-Whitney U test instead of t-Test…")
-                mann_whitney_stat, mann_whitney_p_value = stats.mannwhitneyu(groups[0], groups[1])
-
-                print(f"Mann-Whitney U Test Result:\nU-statistic: {mann_whitney_stat:.6f}\np-value: {mann_whitney_p_value:.6f}")
-                if mann_whitney_p_value < 0.05:
+                print(f"Mann-Whitney U Test Result:\nU-statistic: {result['statistic']:.6f}\np-value: {result['p_value']:.6f}")
+                if result['significant']:
                     print("Result is statistically significant.")
                     print(f"There is a statistically significant difference in the distribution of ‘{cont_var}’ between the groups of ‘{cat_var}’.")
                 else:
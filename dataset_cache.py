@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'group2', 'datasets')
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# Size of each block read for the content hash (start, middle and end of the file)
+HASH_BLOCK = 1024 * 1024
+INDEX_FILE = 'index.json'
+
+
+def file_fingerprint(file_path):
+    """Return the path, size, mtime and a sampled content hash identifying the current version of a file.
+
+    Size and mtime catch ordinary edits; the hash of the first, middle and last megabyte catches files
+    that were rewritten in place with the same size and timestamp, without reading multi-GB files in full.
+    """
+    stat = os.stat(file_path)
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as handle:
+        if stat.st_size <= 3 * HASH_BLOCK:
+            digest.update(handle.read())
+        else:
+            for offset in (0, stat.st_size // 2, stat.st_size - HASH_BLOCK):
+                handle.seek(offset)
+                digest.update(handle.read(HASH_BLOCK))
+    return {
+        'path': os.path.abspath(file_path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'content_hash': digest.hexdigest(),
+    }
+
+
+class DatasetCache:
+    """On-disk cache of parsed datasets stored as uncompressed Arrow IPC files and memory-mapped on load."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        try:
+            import pyarrow  # noqa: F401
+            self.available = True
+        except ImportError:
+            print("pyarrow is not installed; the dataset cache is disabled.")
+            self.available = False
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.evict_stale()
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path()) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        tmp_path = self._index_path() + f'.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as handle:
+            json.dump(index, handle, indent=1)
+        os.replace(tmp_path, self._index_path())
+
+    def _remove_entry(self, index, key):
+        entry = index.pop(key)
+        try:
+            os.remove(os.path.join(self.cache_dir, entry['file']))
+        except OSError:
+            pass
+
+    @staticmethod
+    def cache_key(fingerprint, variant):
+        payload = json.dumps([fingerprint, variant], sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def evict_stale(self):
+        """Drop entries whose source file is gone or whose size or mtime has changed."""
+        index = self._load_index()
+        stale = []
+        for key, entry in index.items():
+            try:
+                stat = os.stat(entry['path'])
+            except OSError:
+                stale.append(key)
+                continue
+            if (stat.st_size != entry['size'] or stat.st_mtime_ns != entry['mtime']
+                    or not os.path.exists(os.path.join(self.cache_dir, entry['file']))):
+                stale.append(key)
+        for key in stale:
+            self._remove_entry(index, key)
+        if stale:
+            self._save_index(index)
+        return len(stale)
+
+    def get(self, file_path, variant='default'):
+        """Return the cached frame for the current version of file_path, or None on a miss."""
+        if not self.available:
+            return None
+        import pyarrow as pa
+
+        fingerprint = file_fingerprint(file_path)
+        key = self.cache_key(fingerprint, variant)
+        index = self._load_index()
+        entry = index.get(key)
+        if entry is None:
+            return None
+        try:
+            source = pa.memory_map(os.path.join(self.cache_dir, entry['file']), 'r')
+            table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid):
+            self._remove_entry(index, key)
+            self._save_index(index)
+            return None
+        entry['last_access'] = time.time()
+        self._save_index(index)
+        return table.to_pandas(split_blocks=True)
+
+    def put(self, file_path, data, variant='default'):
+        """Store a parsed frame for the current version of file_path, then enforce the size cap."""
+        if not self.available or data is None:
+            return
+        import pyarrow as pa
+
+        fingerprint = file_fingerprint(file_path)
+        key = self.cache_key(fingerprint, variant)
+        file_name = f'{key}.arrow'
+        tmp_path = os.path.join(self.cache_dir, file_name + f'.{os.getpid()}.tmp')
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, os.path.join(self.cache_dir, file_name))
+
+        index = self._load_index()
+        # Older versions of the same file under the same variant can never be hit again
+        for old_key in [k for k, e in index.items()
+                        if e['path'] == fingerprint['path'] and e['variant'] == variant and k != key]:
+            self._remove_entry(index, old_key)
+        entry = dict(fingerprint)
+        entry.update({
+            'variant': variant,
+            'file': file_name,
+            'bytes': os.path.getsize(os.path.join(self.cache_dir, file_name)),
+            'last_access': time.time(),
+        })
+        index[key] = entry
+        self._enforce_size_cap(index)
+        self._save_index(index)
+
+    def _enforce_size_cap(self, index):
+        """Evict least recently used entries until the cache fits within max_bytes."""
+        total = sum(entry['bytes'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= index[key]['bytes']
+            self._remove_entry(index, key)
@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+
+def factorize_groups(series):
+    """Return integer group codes (-1 for missing) and the group labels of a categorical column."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.intp), series.cat.categories
+    codes, labels = pd.factorize(series, sort=True)
+    return codes.astype(np.intp, copy=False), labels
+
+
+def observed_groups(codes, labels):
+    """Drop the groups that have no rows (e.g. unused categories) and renumber the codes of the others."""
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    present = np.flatnonzero(counts)
+    if len(present) == len(labels):
+        return codes, labels
+    # The extra last entry maps missing values (code -1) to -1
+    lookup = np.full(len(labels) + 1, -1, dtype=np.intp)
+    lookup[present] = np.arange(len(present))
+    return lookup[codes], labels[present]
+
+
+def _valid_rows(values, codes):
+    return ~np.isnan(values) & (codes >= 0)
+
+
+def group_moments(values, codes, n_groups):
+    """Return per-group counts, sums and sums of squares, skipping missing values and groups."""
+    valid = _valid_rows(values, codes)
+    values, codes = values[valid], codes[valid]
+    # Centering on the grand mean keeps the sums of squares from cancelling catastrophically
+    shift = values.mean() if len(values) else 0.0
+    centered = values - shift
+    counts = np.bincount(codes, minlength=n_groups)
+    sums = np.bincount(codes, weights=centered, minlength=n_groups)
+    sums_sq = np.bincount(codes, weights=centered * centered, minlength=n_groups)
+    return counts, sums, sums_sq
+
+
+def anova_f(counts, sums, sums_sq):
+    """Return (F, df_between, df_within) for one-way ANOVA from group counts, sums and sums of squares."""
+    present = counts > 0
+    counts, sums, sums_sq = counts[present], sums[present], sums_sq[present]
+    n_groups, total = len(counts), counts.sum()
+    between_terms = (sums * sums / counts).sum()
+    ss_between = between_terms - sums.sum() ** 2 / total
+    ss_within = sums_sq.sum() - between_terms
+    df_between, df_within = n_groups - 1, total - n_groups
+    if df_between < 1 or df_within < 1:
+        return np.nan, df_between, df_within
+    if ss_within <= 0:
+        return (np.inf if ss_between > 0 else np.nan), df_between, df_within
+    return (ss_between / df_between) / (ss_within / df_within), df_between, df_within
+
+
+def rank_values(values):
+    """Return average ranks of the non-missing values (NaN stays NaN) and the tie correction factor."""
+    ranks = np.full(len(values), np.nan)
+    valid = ~np.isnan(values)
+    ranks[valid] = stats.rankdata(values[valid])
+    return ranks, stats.tiecorrect(ranks[valid]) if valid.any() else 1.0
+
+
+def kruskal_h(ranks, tie_correction, codes, n_groups):
+    """Return (H, df) for the Kruskal-Wallis test from precomputed ranks and group codes."""
+    valid = _valid_rows(ranks, codes)
+    if not valid.all():
+        if (~valid & ~np.isnan(ranks)).any():
+            # Ranked rows without a group change the ranking, so rank the remaining rows again
+            ranks, tie_correction = rank_values(np.where(valid, ranks, np.nan))
+        ranks, codes = ranks[valid], codes[valid]
+    counts = np.bincount(codes, minlength=n_groups)
+    rank_sums = np.bincount(codes, weights=ranks, minlength=n_groups)
+    present = counts > 0
+    counts, rank_sums = counts[present], rank_sums[present]
+    total = counts.sum()
+    if len(counts) < 2 or tie_correction == 0:
+        return np.nan, len(counts) - 1
+    h = 12.0 / (total * (total + 1)) * (rank_sums * rank_sums / counts).sum() - 3 * (total + 1)
+    return h / tie_correction, len(counts) - 1
+
+
+def one_way_test(values, codes, n_groups, test, ranks=None):
+    """Return (statistic, p_value) of 'ANOVA' or 'Kruskal-Wallis' for values split by group codes."""
+    if test == 'ANOVA':
+        f_stat, df_between, df_within = anova_f(*group_moments(values, codes, n_groups))
+        return f_stat, stats.f.sf(f_stat, df_between, df_within)
+    if ranks is None:
+        ranks = rank_values(values)
+    h_stat, df = kruskal_h(ranks[0], ranks[1], codes, n_groups)
+    return h_stat, stats.chi2.sf(h_stat, df)
+
+
+def screen_groups(dataset, cont_vars, cat_vars, choose_test):
+    """Test every continuous x categorical combination and return the results sorted by p-value.
+
+    choose_test(values) returns 'ANOVA' or 'Kruskal-Wallis' and is called once per
+    continuous variable; ranks are computed once per continuous variable and codes once per grouping.
+    """
+    groupings = {cat_var: factorize_groups(dataset[cat_var]) for cat_var in cat_vars}
+    records = []
+    for cont_var in cont_vars:
+        values = np.asarray(dataset[cont_var], dtype=np.float64)
+        test = choose_test(values)
+        ranks = rank_values(values) if test == 'Kruskal-Wallis' else None
+        for cat_var in cat_vars:
+            if cat_var == cont_var:
+                continue
+            codes, labels = groupings[cat_var]
+            if test == 'ANOVA':
+                statistic, df_between, df_within = anova_f(*group_moments(values, codes, len(labels)))
+            else:
+                statistic, df_between = kruskal_h(ranks[0], ranks[1], codes, len(labels))
+                df_within = np.nan
+            records.append((cont_var, cat_var, test, statistic, df_between, df_within))
+
+    results = pd.DataFrame(records, columns=['continuous', 'categorical', 'test', 'statistic',
+                                             'df_between', 'df_within'])
+    # p-values for all combinations in one vectorized call per distribution
+    is_anova = (results['test'] == 'ANOVA').to_numpy()
+    p_values = np.full(len(results), np.nan)
+    statistic = results['statistic'].to_numpy(dtype=np.float64)
+    df_between = results['df_between'].to_numpy(dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        p_values[is_anova] = stats.f.sf(statistic[is_anova], df_between[is_anova],
+                                        results['df_within'].to_numpy(dtype=np.float64)[is_anova])
+        p_values[~is_anova] = stats.chi2.sf(statistic[~is_anova], df_between[~is_anova])
+    results['p_value'] = p_values
+    return results.sort_values('p_value', ignore_index=True, na_position='last')
+
+
+def average_ranks(matrix):
+    """Return the average ranks within each column of a 2-D array (NaN stays NaN) and per-column tie sums.
+
+    The tie sum of a column is sum(t**3 - t) over its runs of t equal values, as used by the tie
+    corrections of rank tests. All columns are ranked together from a single row-wise sort of the
+    transposed array, which keeps every column contiguous in memory.
+    """
+    values = np.ascontiguousarray(matrix.T, dtype=np.float64)
+    n_rows = values.shape[1]
+    order = np.argsort(values, axis=1, kind='stable')
+    ordered = np.take_along_axis(values, order, axis=1)
+    positions = np.arange(n_rows)
+    # NaN never equals itself, so missing values (sorted last) form runs of one and are masked below
+    starts_run = np.ones(ordered.shape, dtype=bool)
+    starts_run[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    ends_run = np.ones(ordered.shape, dtype=bool)
+    ends_run[:, :-1] = starts_run[:, 1:]
+    run_start = np.maximum.accumulate(np.where(starts_run, positions, 0), axis=1)
+    run_end = np.minimum.accumulate(np.where(ends_run, positions, n_rows - 1)[:, ::-1], axis=1)[:, ::-1]
+
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, (run_start + run_end) / 2.0 + 1.0, axis=1)
+    ranks[np.isnan(values)] = np.nan
+    run_lengths = np.where(ends_run & ~np.isnan(ordered), run_end - run_start + 1, 0).astype(np.float64)
+    return ranks.T, (run_lengths ** 3 - run_lengths).sum(axis=1)
+
+
+def two_group_tests(matrix, codes, ranks=None):
+    """Compare two groups in every column of a 2-D array, for one or several groupings at once.
+
+    codes holds one row of group codes (0 or 1; -1 is missing) per grouping. Returns a dict of
+    (groupings x columns) arrays: group sizes and means, Welch and Student t with their two-sided
+    p-values, and the Mann-Whitney U of group 0 with its tie-corrected normal-approximation p-value
+    (with continuity correction, as scipy.stats.mannwhitneyu computes it for larger samples).
+    ranks, the result of average_ranks(matrix), is reused by every grouping with no missing codes.
+    """
+    codes = np.atleast_2d(codes)
+    n_groupings = len(codes)
+    valid = ~np.isnan(matrix)
+    # Rows missing a group have no membership, so one product gives the sums of every grouping
+    membership = np.concatenate([codes == 0, codes == 1]).astype(np.float64)
+    # Centering each column on its mean keeps the sums of squares from cancelling catastrophically
+    shift = np.where(valid, matrix, 0.0).sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    centered = np.where(valid, matrix - shift, 0.0)
+    counts = membership @ valid.astype(np.float64)
+    sums = membership @ centered
+    sums_sq = membership @ (centered * centered)
+
+    ranks, tie_sums = ranks if ranks is not None else average_ranks(matrix)
+    rank_sums = membership @ np.where(valid, ranks, 0.0)
+    tie_sums = np.tile(tie_sums, (n_groupings, 1))
+    for i in np.flatnonzero((codes < 0).any(axis=1)):
+        # Rows without a group are left out of the ranking of this grouping
+        grouped_ranks, tie_sums[i] = average_ranks(np.where((codes[i] >= 0)[:, None], matrix, np.nan))
+        grouped_ranks = np.nan_to_num(grouped_ranks)
+        rank_sums[i], rank_sums[n_groupings + i] = (codes[i] == 0) @ grouped_ranks, (codes[i] == 1) @ grouped_ranks
+
+    n1, n2 = counts[:n_groupings], counts[n_groupings:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+        variances = (sums_sq - sums * means) / (counts - 1)
+        mean1, mean2 = means[:n_groupings], means[n_groupings:]
+        var1, var2 = variances[:n_groupings], variances[n_groupings:]
+        difference = mean1 - mean2
+
+        welch_se = var1 / n1 + var2 / n2
+        welch_t = difference / np.sqrt(welch_se)
+        welch_df = welch_se ** 2 / ((var1 / n1) ** 2 / (n1 - 1) + (var2 / n2) ** 2 / (n2 - 1))
+
+        student_df = n1 + n2 - 2
+        pooled = ((n1 - 1) * var1 + (n2 - 1) * var2) / student_df
+        student_t = difference / np.sqrt(pooled * (1 / n1 + 1 / n2))
+
+        total = n1 + n2
+        u_statistic = rank_sums[:n_groupings] - n1 * (n1 + 1) / 2
+        u_sd = np.sqrt(n1 * n2 / 12 * ((total + 1) - tie_sums / (total * (total - 1))))
+        z = (np.maximum(u_statistic, n1 * n2 - u_statistic) - n1 * n2 / 2 - 0.5) / u_sd
+
+    return {
+        'n_1': n1.astype(np.int64),
+        'n_2': n2.astype(np.int64),
+        'mean_1': mean1 + shift,
+        'mean_2': mean2 + shift,
+        'welch_t': welch_t,
+        'welch_df': welch_df,
+        'welch_p': 2 * stats.t.sf(np.abs(welch_t), welch_df),
+        'student_t': student_t,
+        'student_p': 2 * stats.t.sf(np.abs(student_t), student_df),
+        'mann_whitney_u': u_statistic,
+        'mann_whitney_p': np.minimum(2 * stats.norm.sf(z), 1.0),
+    }
+
+
+def adjust_p_values(p_values, method='bh'):
+    """Return p-values adjusted for multiple testing by 'bh' (Benjamini-Hochberg FDR) or 'holm' (FWER).
+
+    NaN p-values are left as NaN and do not count towards the number of tests.
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    adjusted = np.full(len(p_values), np.nan)
+    tested = np.flatnonzero(~np.isnan(p_values))
+    m = len(tested)
+    if m == 0:
+        return adjusted
+    order = tested[np.argsort(p_values[tested], kind='stable')]
+    ordered = p_values[order]
+    if method == 'bh':
+        # Step-up: running minimum of p * m / rank from the largest p-value down
+        scaled = ordered * m / np.arange(1, m + 1)
+        ordered = np.minimum.accumulate(scaled[::-1])[::-1]
+    elif method == 'holm':
+        # Step-down: running maximum of p * (m - rank + 1) from the smallest p-value up
+        ordered = np.maximum.accumulate(ordered * np.arange(m, 0, -1))
+    else:
+        raise ValueError(f"Unknown correction '{method}'. Choose 'bh' or 'holm'.")
+    adjusted[order] = np.minimum(ordered, 1.0)
+    return adjusted
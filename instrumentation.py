@@ -0,0 +1,156 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Set to a file path (or to 1 for DEFAULT_TRACE_PATH) to record spans from the start of the process
+TRACE_ENV_VAR = 'GROUP2_TRACE'
+DEFAULT_TRACE_PATH = 'group2_trace.jsonl'
+
+_state = {'enabled': False, 'file': None, 'summary': {}}
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def current_rss():
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # Without /proc, fall back to the peak so far: kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def is_enabled():
+    return _state['enabled']
+
+
+def enable(path=DEFAULT_TRACE_PATH):
+    """Start writing spans as JSON lines to path and print a summary table when the process exits."""
+    if _state['enabled']:
+        return
+    _state['file'] = open(path, 'a', buffering=1)
+    _state['enabled'] = True
+    atexit.register(_finish)
+
+
+def disable():
+    if not _state['enabled']:
+        return
+    _state['enabled'] = False
+    _state['file'].close()
+    _state['file'] = None
+
+
+class _Span:
+    __slots__ = ('name', 'attributes', 'parent', 'start_time', 'start_wall', 'start_cpu', 'start_rss')
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start_rss = current_rss()
+        self.start_time = time.time()
+        self.start_cpu = time.process_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        rss = current_rss()
+        _local.stack.pop()
+        record = {
+            'name': self.name,
+            'parent': self.parent,
+            'depth': len(_local.stack),
+            'start': self.start_time,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'rss_mb': rss / 1024 ** 2,
+            'rss_delta_mb': (rss - self.start_rss) / 1024 ** 2,
+            'pid': os.getpid(),
+            'error': exc_type.__name__ if exc_type else None,
+        }
+        if self.attributes:
+            record['attributes'] = self.attributes
+        _record(record)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **attributes):
+    """Context manager timing a block as a named span; a shared no-op when tracing is disabled."""
+    if not _state['enabled']:
+        return _NULL_SPAN
+    return _Span(name, attributes)
+
+
+def traced(name=None):
+    """Decorator recording every call of a function as a span named name (default: its qualified name)."""
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _state['enabled']:
+                return function(*args, **kwargs)
+            with _Span(span_name, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _record(record):
+    with _lock:
+        if _state['file'] is not None:
+            _state['file'].write(json.dumps(record, default=str) + '\n')
+        totals = _state['summary'].setdefault(record['name'], [0, 0.0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += record['wall_s']
+        totals[2] += record['cpu_s']
+        totals[3] = max(totals[3], record['rss_delta_mb'])
+
+
+def summary_table():
+    """Return the per-span totals recorded so far as text, slowest first."""
+    rows = sorted(_state['summary'].items(), key=lambda item: item[1][1], reverse=True)
+    lines = [f"{'Span':<40}{'Calls':>7}{'Wall (s)':>12}{'CPU (s)':>12}{'Max RSS Δ (MB)':>16}", "-" * 87]
+    for name, (calls, wall, cpu, rss_delta) in rows:
+        lines.append(f"{name[:39]:<40}{calls:>7}{wall:>12.4f}{cpu:>12.4f}{rss_delta:>16.1f}")
+    return '\n'.join(lines)
+
+
+def _finish():
+    if _state['summary']:
+        print("\nTrace summary:\n" + summary_table(), file=sys.stderr)
+    disable()
+
+
+_env_value = os.environ.get(TRACE_ENV_VAR)
+if _env_value:
+    enable(DEFAULT_TRACE_PATH if _env_value.lower() in ('1', 'true', 'yes') else _env_value)
@@ -1,40 +1,126 @@
+import argparse
 import importlib
 import sys
 import os
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from column_profiler import profile_columns
+from column_store import open_column_store
+from compact_loader import DEFAULT_CHUNKSIZE, read_csv_compact
+from dataset_cache import DEFAULT_CACHE_DIR, DatasetCache, file_fingerprint
+from instrumentation import DEFAULT_TRACE_PATH, enable as enable_tracing, span, traced
+from plot_variable_distribution import DEFAULT_BINS, compute_histogram, histograms_from_csv, save_distribution_plots
+from result_cache import DEFAULT_MAX_ENTRIES as DEFAULT_RESULT_CACHE_ENTRIES, ResultCache
+from sentiment_cache import DEFAULT_CACHE_PATH as DEFAULT_SCORE_CACHE_PATH
+
+DEFAULT_STARTUP_BUDGET_S = 1.5
 
 
 class DataAnalysis:
-    def __init__(self, file_path):
+    def __init__(self, file_path, compact=False, chunksize=DEFAULT_CHUNKSIZE, cache=None, column_store=None,
+                 streaming_summary=False, workers=1, result_cache=None):
         self.file_path = file_path
-        self.dataset = self.load_dataset()
+        self.compact = compact
+        self.chunksize = chunksize
+        self.cache = cache
+        # Directory of a memory-mapped column store to read the dataset from, or None to load it into memory
+        self.column_store = column_store
+        # Summarize the CSV in streaming chunks (approximate median and mode) instead of the loaded columns
+        self.streaming_summary = streaming_summary
+        self.workers = workers
+        self.profile = None
+        self.histograms = {}
+        self.subset_index = None
+        # Results of earlier analyses of this file, or None to always recompute. The fingerprint is taken
+        # again just before loading, so results are only cached while the file matches the data in memory.
+        self.results = None
+        if result_cache is not None and os.path.exists(file_path):
+            self.results = result_cache.for_file(file_path, file_fingerprint(file_path))
+        self._dataset = None
+        self._loaded = False
+        # A streaming summary reads the CSV itself, so the full dataset is only loaded (into memory, unless
+        # it is a column store) when an analysis first needs it
+        if not streaming_summary or column_store is not None:
+            self._dataset, self._loaded = self.load_dataset(), True
+
+    @property
+    def dataset(self):
+        if not self._loaded:
+            self._dataset = self.load_dataset()
+            self._loaded = True
+        return self._dataset
 
+    @traced()
     def load_dataset(self):
         try:
-            data = pd.read_csv(self.file_path)
+            if self.results is not None:
+                self.results.fingerprint = file_fingerprint(self.file_path)
+            if self.column_store is not None:
+                data = open_column_store(self.file_path, self.column_store or None, self.chunksize)
+                print(f"Dataset opened from column store: {data.store_dir}")
+                return data
+            variant = 'compact' if self.compact else 'default'
+            if self.cache is not None:
+                data = self.cache.get(self.file_path, variant)
+                if data is not None:
+                    print(f"Dataset loaded from cache for: {self.file_path}")
+                    return data
+            if self.compact:
+                data = read_csv_compact(self.file_path, chunksize=self.chunksize)
+            else:
+                data = pd.read_csv(self.file_path)
             print(f"Dataset loaded successfully from: {self.file_path}")
+            if self.cache is not None:
+                self.cache.put(self.file_path, data, variant)
             return data
         except Exception as e:
             print(f"Error loading dataset: {e}")
             return None
 
+    def get_profile(self):
+        """Return the per-column statistics, computing them on first use."""
+        if self.profile is None and self.streaming_summary:
+            from streaming_summary import summarize_csv
+            try:
+                with span('summarize_csv', workers=self.workers):
+                    self.profile = summarize_csv(self.file_path, self.chunksize, self.workers)
+            except Exception as e:
+                print(f"Error summarizing dataset: {e}")
+        elif self.profile is None and self.dataset is not None:
+            with span('profile_columns', columns=len(self.dataset.columns)):
+                self.profile = profile_columns(self.dataset)
+        return self.profile
+
+    def get_subset_index(self):
+        """Return the filter / stratify indexes of the dataset, created on first use."""
+        if self.subset_index is None and self.dataset is not None:
+            from subset_index import SubsetIndex
+            self.subset_index = SubsetIndex(self.dataset)
+        return self.subset_index
+
+    def get_histogram(self, variable, bins=DEFAULT_BINS):
+        """Return the (counts, edges) histogram of a numeric variable, computing it on first use."""
+        key = (variable, bins)
+        if key not in self.histograms:
+            with span('compute_histogram', variable=variable):
+                self.histograms[key] = compute_histogram(self.dataset[variable], bins)
+        return self.histograms[key]
+
+    @traced()
     def summarize_variables(self):
-        if self.dataset is not None:
+        profile = self.get_profile()
+        if profile is not None:
             print("Following are the variables in your dataset:")
             print(f"{'Variable':<20}{'Type':<15}{'Mean/Median/Mode':<25}{'Skewness':<10}")
             print("-" * 70)
-            for column in self.dataset.columns:
-                dtype = str(self.dataset[column].dtype)
-                col_type = 'Categorical' if dtype == 'object' else 'Numerical'
+            for column, stats in profile.iterrows():
+                col_type = stats['kind']
 
                 if col_type == 'Numerical':
-                    mean_value = self.dataset[column].mean()
-                    median_value = self.dataset[column].median()
-                    skewness_value = self.dataset[column].skew()
-                    mean_median_mode = f"Mean: {mean_value:.2f}, Median: {median_value:.2f}"
+                    skewness_value = stats['skew']
+                    mean_median_mode = f"Mean: {stats['mean']:.2f}, Median: {stats['median']:.2f}"
                 else:
-                    mode_value = self.dataset[column].mode()[0] if not self.dataset[column].mode().empty else 'N/A'
+                    mode_value = stats['mode'] if stats['count'] > 0 else 'N/A'
                     skewness_value = "N/A"
                     mean_median_mode = f"Mode: {mode_value}"
 
@@ -54,10 +140,14 @@ class DataAnalysis:
             print("No dataset loaded.")
             return 0
 
+    @traced()
     def plot_distribution(self, variable):
+        import matplotlib.pyplot as plt
+
         if variable in self.dataset.columns:
             if pd.api.types.is_numeric_dtype(self.dataset[variable]):
-                self.dataset[variable].hist()
+                counts, edges = self.get_histogram(variable)
+                plt.stairs(counts, edges, fill=True)
                 plt.title(f"{variable} Distribution")
                 plt.xlabel(variable)
                 plt.ylabel("Frequency")
@@ -68,11 +158,18 @@ class DataAnalysis:
             print(f"Variable '{variable}' does not exist in the dataset.")
 
 
+# Analysis modules imported so far, so each one is only loaded (and announced) once
+_loaded_modules = {}
+
+
 def load_module(module_name):
+    if module_name in _loaded_modules:
+        return _loaded_modules[module_name]
     try:
         # Dynamically import the module using importlib
         module = importlib.import_module(module_name)
         print(f"Module '{module_name}' loaded successfully.")
+        _loaded_modules[module_name] = module
         return module
     except ImportError as e:
         print(f"Error loading module '{module_name}': {e}")
@@ -89,9 +186,98 @@ def get_file_path():
             print("File not found or invalid format. Please enter a valid .csv file path.")
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive statistical analysis of a CSV dataset.")
+    parser.add_argument('--compact', action='store_true',
+                        help="read the CSV in chunks into categorical codes and narrow numeric types")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help="rows per chunk when reading in compact mode")
+    parser.add_argument('--column-store', nargs='?', const='', metavar='DIR',
+                        help="convert the CSV once into memory-mapped column files and read columns on demand")
+    parser.add_argument('--streaming-summary', action='store_true',
+                        help="summarize the CSV chunk by chunk with constant memory per column (approximate "
+                             "median and mode); uses --workers processes. The dataset is then only loaded when "
+                             "an analysis needs it, into memory unless --column-store is given")
+    parser.add_argument('--cache', action='store_true',
+                        help="reuse a binary copy of the parsed dataset across runs")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help="directory holding cached datasets")
+    parser.add_argument('--cache-max-mb', type=int, default=2048,
+                        help="size cap of the dataset cache; least recently used entries are evicted")
+    parser.add_argument('--trace', nargs='?', const=DEFAULT_TRACE_PATH, metavar='PATH',
+                        help="record timing and memory spans as JSON lines (also enabled by GROUP2_TRACE)")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="report the time to the first prompt and the import time of each module, then exit")
+    parser.add_argument('--startup-budget', type=float, default=DEFAULT_STARTUP_BUDGET_S,
+                        help="seconds allowed before the first prompt with --profile-startup")
+    parser.add_argument('--dataset', metavar='PATH', help="CSV file to analyze instead of prompting for one")
+    parser.add_argument('--plots', metavar='DIR',
+                        help="save distribution plots of the numeric variables to DIR without a display, then exit")
+    parser.add_argument('--plot-format', choices=['png', 'svg'], default='png', help="file format for --plots")
+    parser.add_argument('--plot-columns', nargs='+', metavar='COLUMN',
+                        help="variables to plot with --plots (default: all numeric variables)")
+    parser.add_argument('--plot-bins', type=int, default=DEFAULT_BINS, help="histogram bins for --plots")
+    parser.add_argument('--plot-grid', action='store_true',
+                        help="with --plots, also save all histograms in one grid figure")
+    parser.add_argument('--batch', metavar='SPEC',
+                        help="run the analyses listed in a JSON/YAML job spec without prompts")
+    parser.add_argument('--output', help="results file for --batch (.json or .csv)")
+    parser.add_argument('--workers', type=int, help="worker processes for --batch, --plots, --serve and --streaming-summary")
+    parser.add_argument('--sentiment-batch-size', type=int, default=32,
+                        help="texts per batch for transformer sentiment analysis")
+    parser.add_argument('--sentiment-threads', type=int,
+                        help="CPU threads used by the transformer sentiment model")
+    parser.add_argument('--sentiment-cache', nargs='?', const=DEFAULT_SCORE_CACHE_PATH, metavar='PATH',
+                        help="reuse sentiment scores stored in a SQLite file across runs")
+    parser.add_argument('--result-cache', nargs='?', const='', metavar='DIR',
+                        help="reuse the results of repeated analyses; give a directory to keep them across runs")
+    parser.add_argument('--result-cache-size', type=int, default=DEFAULT_RESULT_CACHE_ENTRIES,
+                        help="results kept in memory by --result-cache; least recently used ones are evicted")
+    parser.add_argument('--serve', action='store_true',
+                        help="run a local analysis server that keeps datasets loaded between requests")
+    parser.add_argument('--port', type=int, default=8765, help="TCP port for --serve")
+    parser.add_argument('--socket', metavar='PATH', help="unix socket for --serve instead of a TCP port")
+    return parser.parse_args(argv)
+
+
 def main():
-    file_path = get_file_path()
-    data_analysis = DataAnalysis(file_path)
+    args = parse_args()
+    if args.trace:
+        enable_tracing(args.trace)
+    if args.profile_startup:
+        from startup_profile import profile_startup
+        sys.exit(0 if profile_startup(args.startup_budget) else 1)
+    if args.serve:
+        from analysis_server import run_server
+        run_server(port=args.port, socket_path=args.socket, workers=args.workers)
+        return
+    if args.batch:
+        from batch_runner import run_batch
+        run_batch(args.batch, args.output, args.workers)
+        return
+    if args.plots:
+        file_path = args.dataset or get_file_path()
+        try:
+            histograms = histograms_from_csv(file_path, args.plot_columns, args.plot_bins, args.chunksize)
+        except ValueError as e:
+            print(f"Cannot plot the distributions: {e}")
+            sys.exit(2)
+        paths = save_distribution_plots(histograms, args.plots, args.plot_format, args.workers, args.plot_grid)
+        print(f"Saved {len(paths)} plots to: {args.plots}")
+        return
+
+    cache = DatasetCache(args.cache_dir, args.cache_max_mb * 1024 ** 2) if args.cache else None
+    score_cache = None
+    if args.sentiment_cache:
+        from sentiment_cache import SentimentScoreCache
+        score_cache = SentimentScoreCache(args.sentiment_cache)
+    result_cache = None
+    if args.result_cache is not None:
+        result_cache = ResultCache(args.result_cache_size, args.result_cache or None)
+    file_path = args.dataset or get_file_path()
+    data_analysis = DataAnalysis(file_path, compact=args.compact, chunksize=args.chunksize, cache=cache,
+                                 column_store=args.column_store, streaming_summary=args.streaming_summary,
+                                 workers=args.workers or 1, result_cache=result_cache)
     data_analysis.summarize_variables()
 
     while True:
@@ -102,8 +288,10 @@ def main():
         print("4. Conduct chi-Square")
         print("5. Conduct Regression")
         print("6. Conduct Sentiment Analysis")
-        print("7. Quit")
-        choice = input("Enter your choice (1-7): ")
+        print("7. Filter / stratify")
+        print("8. Conduct Correlation")
+        print("9. Quit")
+        choice = input("Enter your choice (1-9): ")
 
         if choice == '1':
             variable_count = data_analysis.display_variable_options()
@@ -126,28 +314,40 @@ def main():
         elif choice == '2':
             module = load_module('conduct_anova')
             if module:
-                module.conduct_anova(data_analysis.dataset)
+                module.conduct_anova(data_analysis.dataset, data_analysis.get_profile(), data_analysis.results)
         elif choice == '3':
             module = load_module('conduct_t_test')
             if module:
-                module.conduct_t_test(data_analysis.dataset)
+                module.conduct_t_test(data_analysis.dataset, data_analysis.get_profile(), data_analysis.results)
         elif choice == '4':
             module = load_module('conduct_chi_square')
             if module:
-                module.conduct_chi_square(data_analysis.dataset)
+                module.conduct_chi_square(data_analysis.dataset, data_analysis.get_profile(), data_analysis.results)
         elif choice == '5':
             module = load_module('conduct_regression')
             if module:
-                module.conduct_regression(data_analysis.dataset)
+                module.conduct_regression(data_analysis.dataset, data_analysis.get_profile(), data_analysis.results)
         elif choice == '6':
             module = load_module('conduct_sentiment_analysis')
             if module:
-                module.conduct_sentiment_analysis(data_analysis.dataset)
+                module.conduct_sentiment_analysis(data_analysis.dataset, data_analysis.get_profile(),
+                                                  args.sentiment_batch_size, args.sentiment_threads, score_cache)
         elif choice == '7':
+            module = load_module('subset_index')
+            if module:
+                module.conduct_subset_analysis(data_analysis.dataset, data_analysis.get_subset_index(),
+                                               data_analysis.get_profile())
+        elif choice == '8':
+            module = load_module('conduct_correlation')
+            if module:
+                module.conduct_correlation(data_analysis.dataset, data_analysis.get_profile(), data_analysis.results)
+        elif choice == '9':
+            if result_cache is not None:
+                print(result_cache.summary())
             print("Exiting the program...")
             sys.exit()
         else:
-            print("Invalid choice, please enter a number between 1 and 7.")
+            print("Invalid choice, please enter a number between 1 and 9.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+import numpy as np
+import scipy.stats as stats
+
+# Shapiro-Wilk is only reliable up to this many observations; larger samples use D'Agostino's K²
+SHAPIRO_MAX_N = 5000
+# D'Agostino's kurtosis test needs at least this many observations
+MOMENT_TEST_MIN_N = 20
+MOMENT_CHUNKSIZE = 1_000_000
+QQ_QUANTILES = 200
+# Q-Q quantiles are estimated from a seeded subsample of at most this many values
+QQ_SAMPLE = 100_000
+
+
+def chunk_moments(values):
+    """Return (n, mean, M2, M3, M4) of an array, where Mk is the sum of centered k-th powers."""
+    n = len(values)
+    if n == 0:
+        return 0, 0.0, 0.0, 0.0, 0.0
+    mean = values.mean()
+    centered = values - mean
+    squared = centered * centered
+    return n, mean, squared.sum(), (squared * centered).sum(), (squared * squared).sum()
+
+
+def merge_moments(first, second):
+    """Combine the moments of two disjoint parts of a sample (Pébay's pairwise update)."""
+    n_a, mean_a, m2_a, m3_a, m4_a = first
+    n_b, mean_b, m2_b, m3_b, m4_b = second
+    n = n_a + n_b
+    if n_a == 0 or n_b == 0:
+        return first if n_b == 0 else second
+    delta = mean_b - mean_a
+    delta_n = delta / n
+    mean = mean_a + n_b * delta_n
+    m2 = m2_a + m2_b + delta * delta_n * n_a * n_b
+    m3 = (m3_a + m3_b + delta * delta_n ** 2 * n_a * n_b * (n_a - n_b)
+          + 3 * delta_n * (n_a * m2_b - n_b * m2_a))
+    m4 = (m4_a + m4_b + delta * delta_n ** 3 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b)
+          + 6 * delta_n ** 2 * (n_a * n_a * m2_b + n_b * n_b * m2_a)
+          + 4 * delta_n * (n_a * m3_b - n_b * m3_a))
+    return n, mean, m2, m3, m4
+
+
+def streaming_moments(values, chunksize=MOMENT_CHUNKSIZE):
+    """Return (n, mean, M2, M3, M4) of the non-missing values, one chunk at a time."""
+    values = np.asarray(values, dtype=np.float64)
+    moments = chunk_moments(values[:0])
+    for start in range(0, len(values), chunksize):
+        chunk = values[start:start + chunksize]
+        moments = merge_moments(moments, chunk_moments(chunk[~np.isnan(chunk)]))
+    return moments
+
+
+def dagostino_pearson(moments):
+    """D'Agostino-Pearson K² test from sample moments; matches scipy.stats.normaltest."""
+    n, mean, m2, m3, m4 = moments
+    n = float(n)
+    skewness = (m3 / n) / (m2 / n) ** 1.5
+    kurtosis = (m4 / n) / (m2 / n) ** 2
+
+    # Skewness test
+    y = skewness * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+    beta2 = (3.0 * (n * n + 27 * n - 70) * (n + 1) * (n + 3)
+             / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9)))
+    w2 = -1 + np.sqrt(2 * (beta2 - 1))
+    delta = 1 / np.sqrt(0.5 * np.log(w2))
+    alpha = np.sqrt(2.0 / (w2 - 1))
+    y = y if y != 0 else 1.0
+    z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+    # Kurtosis test
+    expected = 3.0 * (n - 1) / (n + 1)
+    variance = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+    x = (kurtosis - expected) / np.sqrt(variance)
+    sqrt_beta1 = (6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9))
+                  * np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3))))
+    a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / sqrt_beta1 ** 2))
+    term1 = 1 - 2 / (9.0 * a)
+    denominator = 1 + x * np.sqrt(2 / (a - 4.0))
+    term2 = np.sign(denominator) * np.cbrt((1 - 2.0 / a) / abs(denominator)) if denominator else np.nan
+    z_kurt = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+    statistic = z_skew ** 2 + z_kurt ** 2
+    return float(statistic), float(stats.chi2.sf(statistic, 2))
+
+
+def subsample(values, size, seed=0):
+    """Return a reproducible random subsample of at most size values, in their original order."""
+    if len(values) <= size:
+        return values
+    rng = np.random.default_rng(seed)
+    return values[np.sort(rng.choice(len(values), size, replace=False))]
+
+
+def profile_moments(profile, column):
+    """Return the (n, mean, M2, M3, M4) moments of a column recorded with its profile, or None."""
+    return None if profile is None else profile.attrs.get('moments', {}).get(column)
+
+
+def normality_test(values, method='auto', max_sample=SHAPIRO_MAX_N, seed=0, alpha=0.05, moments=None):
+    """Test a sample for normality with a test suited to its size.
+
+    method='auto' uses Shapiro-Wilk up to max_sample values and D'Agostino's K², computed from
+    streaming moments, above that. method='shapiro' always uses Shapiro-Wilk, on a seeded subsample
+    of max_sample values when the sample is larger. Missing values are ignored. moments, the
+    streaming moments of the values computed earlier (e.g. by profile_moments), spare the large-sample
+    test its pass over the data.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if method == 'auto':
+        n = moments[0] if moments is not None else len(values) - np.count_nonzero(np.isnan(values))
+        method = 'shapiro' if n <= max_sample or n < MOMENT_TEST_MIN_N else 'dagostino'
+
+    if method == 'dagostino':
+        if moments is None:
+            moments = streaming_moments(values)
+        if moments[0] < MOMENT_TEST_MIN_N:
+            raise ValueError(f"D'Agostino's K² test needs at least {MOMENT_TEST_MIN_N} observations.")
+        statistic, p_value = dagostino_pearson(moments)
+        test, n_used = "D'Agostino K²", moments[0]
+    elif method == 'shapiro':
+        sample = subsample(values[~np.isnan(values)], max_sample, seed)
+        statistic, p_value = stats.shapiro(sample)
+        test, n_used = 'Shapiro-Wilk', len(sample)
+    else:
+        raise ValueError(f"Unknown normality test '{method}'. Choose 'auto', 'shapiro' or 'dagostino'.")
+
+    return {
+        'test': test,
+        'statistic': float(statistic),
+        'p_value': float(p_value),
+        'n': int(n_used),
+        'normal': bool(p_value >= alpha),
+    }
+
+
+def qq_points(values, n_quantiles=QQ_QUANTILES, max_sample=QQ_SAMPLE, seed=0):
+    """Return theoretical and sample quantiles at n_quantiles plotting positions, plus a fitted line."""
+    values = subsample(np.asarray(values, dtype=np.float64), max_sample, seed)
+    values = values[~np.isnan(values)]
+    n_quantiles = min(n_quantiles, len(values))
+    positions = (np.arange(1, n_quantiles + 1) - 0.5) / n_quantiles
+    theoretical = stats.norm.ppf(positions)
+    sample = np.quantile(values, positions)
+    slope, intercept = np.polyfit(theoretical, sample, 1)
+    return theoretical, sample, slope, intercept
+
+
+def plot_qq(values, title=None, n_quantiles=QQ_QUANTILES, points=None):
+    """Show a normal Q-Q plot drawn from n_quantiles quantiles rather than every observation.
+
+    points, a qq_points result computed earlier, is drawn instead of recomputing the quantiles.
+    """
+    import matplotlib.pyplot as plt
+
+    theoretical, sample, slope, intercept = points if points is not None else qq_points(values, n_quantiles)
+    plt.figure(figsize=(6, 4))
+    plt.plot(theoretical, sample, 'o', markersize=3)
+    plt.plot(theoretical, slope * theoretical + intercept, 'r-')
+    plt.xlabel("Theoretical quantiles")
+    plt.ylabel("Ordered Values")
+    plt.title(title or "Probability Plot")
+    plt.show()
@@ -1,16 +1,154 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-from matplotlib import pyplot as plt
+
+# Same bin count as Series.hist()
+DEFAULT_BINS = 10
+GRID_COLUMNS = 4
 
 
 def plot_distribution(self, variable):
+    from matplotlib import pyplot as plt
+
     if variable in self.dataset.columns:
         if pd.api.types.is_numeric_dtype(self.dataset[variable]):
-            self.dataset[variable].hist()
-            plt.title(f"Distribution plot for '{variable}'")  # 更新图表标题
-            plt.xlabel(variable)
-            plt.ylabel("Frequency")
+            # Draw the binned counts rather than handing every value to matplotlib
+            counts, edges = compute_histogram(self.dataset[variable])
+            _draw_histogram(plt.figure().add_subplot(), variable, counts, edges)
             plt.show()
         else:
             print(f"Variable '{variable}' is not numerical, can't plot distribution.")
     else:
         print(f"Variable '{variable}' does not exist in the dataset.")
+
+
+def check_columns(available, columns):
+    """Raise ValueError naming any of the requested columns that are not among the available ones."""
+    unknown = [column for column in columns or [] if column not in set(available)]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(map(str, unknown))}. "
+                         f"Available columns: {', '.join(map(str, available))}.")
+
+
+def numeric_columns(dataset, columns=None):
+    """Return the numeric columns of a dataset, or of the given subset, in dataset order."""
+    check_columns(dataset.columns, columns)
+    wanted = set(dataset.columns if columns is None else columns)
+    return [column for column in dataset.columns
+            if column in wanted and pd.api.types.is_numeric_dtype(dataset[column])]
+
+
+def _finite(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[np.isfinite(values)]
+
+
+def _edges(low, high, bins):
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def compute_histogram(values, bins=DEFAULT_BINS):
+    """Return (counts, edges) of the finite values, with bins of equal width over their range."""
+    values = _finite(values)
+    if len(values) == 0:
+        return np.zeros(bins, dtype=np.int64), _edges(0.0, 1.0, bins)
+    edges = _edges(values.min(), values.max(), bins)
+    counts, edges = np.histogram(values, bins=edges)
+    return counts, edges
+
+
+def compute_histograms(dataset, columns=None, bins=DEFAULT_BINS):
+    """Return {column: (counts, edges)} for the numeric columns of an in-memory dataset."""
+    return {column: compute_histogram(dataset[column], bins) for column in numeric_columns(dataset, columns)}
+
+
+def histograms_from_csv(file_path, columns=None, bins=DEFAULT_BINS, chunksize=100_000):
+    """Return {column: (counts, edges)} for the numeric columns of a CSV, reading it in chunks.
+
+    The file is read twice: once for each column's range, which fixes the bin edges, and once to
+    count values into those bins. Neither pass holds more than one chunk in memory. Raises
+    ValueError naming any of the columns that are not in the file's header.
+    """
+    check_columns(pd.read_csv(file_path, nrows=0).columns, columns)
+    ranges = {}
+    for chunk in pd.read_csv(file_path, usecols=columns, chunksize=chunksize):
+        for column in numeric_columns(chunk):
+            values = _finite(chunk[column])
+            if len(values) == 0:
+                ranges.setdefault(column, None)
+                continue
+            low, high = values.min(), values.max()
+            previous = ranges.get(column)
+            ranges[column] = (low, high) if previous is None else (min(previous[0], low), max(previous[1], high))
+
+    edges = {column: _edges(*(value_range or (0.0, 1.0)), bins) for column, value_range in ranges.items()}
+    counts = {column: np.zeros(bins, dtype=np.int64) for column in ranges}
+    for chunk in pd.read_csv(file_path, usecols=list(ranges), chunksize=chunksize):
+        for column in ranges:
+            counts[column] += np.histogram(_finite(chunk[column]), bins=edges[column])[0]
+    return {column: (counts[column], edges[column]) for column in ranges}
+
+
+def _draw_histogram(axes, variable, counts, edges):
+    axes.stairs(counts, edges, fill=True)
+    axes.set_title(f"Distribution plot for '{variable}'")
+    axes.set_xlabel(variable)
+    axes.set_ylabel("Frequency")
+
+
+def render_histogram(task):
+    """Save one histogram, given as (variable, counts, edges, output_path), without a display."""
+    from matplotlib.figure import Figure
+
+    variable, counts, edges, output_path = task
+    figure = Figure(figsize=(6, 4))
+    _draw_histogram(figure.add_subplot(), variable, counts, edges)
+    # A fixed layout is much cheaper than tight_layout and fits a single titled plot
+    figure.subplots_adjust(left=0.12, bottom=0.12, right=0.97, top=0.92)
+    figure.savefig(output_path)
+    return output_path
+
+
+def render_grid(histograms, output_path, columns_per_row=GRID_COLUMNS):
+    """Save the histograms of several variables as one grid figure."""
+    from matplotlib.figure import Figure
+
+    n_rows = max(1, math.ceil(len(histograms) / columns_per_row))
+    figure = Figure(figsize=(4 * columns_per_row, 3 * n_rows))
+    axes = figure.subplots(n_rows, columns_per_row, squeeze=False).ravel()
+    for plot_axes, (variable, (counts, edges)) in zip(axes, histograms.items()):
+        _draw_histogram(plot_axes, variable, counts, edges)
+    for plot_axes in axes[len(histograms):]:
+        plot_axes.set_visible(False)
+    figure.tight_layout()
+    figure.savefig(output_path)
+    return output_path
+
+
+def _file_name(variable):
+    return ''.join(char if char.isalnum() or char in '-_.' else '_' for char in str(variable))
+
+
+def save_distribution_plots(histograms, output_dir, fmt='png', workers=None, grid=False):
+    """Render histograms to PNG or SVG files in output_dir, in parallel, and return the file paths."""
+    if fmt not in ('png', 'svg'):
+        raise ValueError(f"Unsupported plot format '{fmt}'. Choose 'png' or 'svg'.")
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(variable, counts, edges, os.path.join(output_dir, f"{_file_name(variable)}.{fmt}"))
+             for variable, (counts, edges) in histograms.items()]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        paths = [render_histogram(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            paths = list(pool.map(render_histogram, tasks))
+
+    if grid and histograms:
+        paths.append(render_grid(histograms, os.path.join(output_dir, f"distributions.{fmt}")))
+    return paths
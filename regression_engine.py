@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+import scipy.linalg as linalg
+import scipy.stats as stats
+
+from instrumentation import traced
+
+# A predictor whose centered values keep less than this share of their sum of squares once the other
+# predictors are projected out (1 / VIF) is treated as collinear with them
+COLLINEARITY_TOL = 1e-10
+
+
+def column_matrix(dataset, columns):
+    """Stack columns into an (n_rows, n_columns) float64 matrix, column-major so each copy is contiguous."""
+    matrix = np.empty((len(dataset), len(columns)), dtype=np.float64, order='F')
+    for j, column in enumerate(columns):
+        matrix[:, j] = np.asarray(dataset[column], dtype=np.float64)
+    return matrix
+
+
+def pairwise_cross_products(matrix):
+    """Return pairwise (counts, means, cross_products, squares) of the columns of a matrix.
+
+    Entry (i, j) of each result uses only the rows where both column i and column j are present:
+    counts[i, j] is the number of such rows, means[i, j] the mean of column i over them,
+    cross_products[i, j] the centered cross-product of columns i and j, and squares[i, j] the
+    centered sum of squares of column i. Without missing values this is one centered matrix product.
+    """
+    column_means = np.nanmean(matrix, axis=0) if len(matrix) else np.zeros(matrix.shape[1])
+    # Centering first keeps the sums of squares well conditioned
+    centered = matrix - column_means
+    valid = ~np.isnan(matrix)
+    n_columns = matrix.shape[1]
+    if valid.all():
+        cross_products = centered.T @ centered
+        counts = np.full((n_columns, n_columns), float(len(matrix)))
+        means = np.repeat(column_means[:, None], n_columns, axis=1)
+        squares = np.repeat(np.diag(cross_products)[:, None], n_columns, axis=1)
+        return counts, means, cross_products, squares
+
+    filled = np.where(valid, centered, 0.0)
+    indicator = valid.astype(np.float64)
+    counts = indicator.T @ indicator
+    # sums[i, j] is the sum of column i over the rows where column j is also present
+    sums = filled.T @ indicator
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cross_products = filled.T @ filled - sums * sums.T / counts
+        squares = (filled * filled).T @ indicator - sums * sums / counts
+        means = sums / counts + column_means[:, None]
+    return counts, means, cross_products, squares
+
+
+def block_cross_products(first, second):
+    """Return pairwise (counts, cross_products, first_squares, second_squares) between two column blocks.
+
+    Entry (i, j) uses only the rows where column i of first and column j of second are both present:
+    the number of such rows, the centered cross-product of the two columns, and the centered sums of
+    squares of each. The blocks should already be centered on their column means (NaN marks a
+    missing value) so the products stay well conditioned.
+    """
+    valid_first, valid_second = ~np.isnan(first), ~np.isnan(second)
+    if valid_first.all() and valid_second.all():
+        shape = (first.shape[1], second.shape[1])
+        counts = np.full(shape, float(len(first)))
+        cross_products = first.T @ second
+        first_squares = np.broadcast_to(np.einsum('ij,ij->j', first, first)[:, None], shape)
+        second_squares = np.broadcast_to(np.einsum('ij,ij->j', second, second)[None, :], shape)
+        return counts, cross_products, first_squares, second_squares
+
+    filled_first = np.where(valid_first, first, 0.0)
+    filled_second = np.where(valid_second, second, 0.0)
+    indicator_first = valid_first.astype(np.float64)
+    indicator_second = valid_second.astype(np.float64)
+    counts = indicator_first.T @ indicator_second
+    # Sums of each column over the rows where the other column of the pair is present
+    first_sums = filled_first.T @ indicator_second
+    second_sums = indicator_first.T @ filled_second
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cross_products = filled_first.T @ filled_second - first_sums * second_sums / counts
+        first_squares = (filled_first * filled_first).T @ indicator_second - first_sums * first_sums / counts
+        second_squares = indicator_first.T @ (filled_second * filled_second) - second_sums * second_sums / counts
+    return counts, cross_products, first_squares, second_squares
+
+
+@traced()
+def simple_regressions(dataset, dep_vars, predictors):
+    """Fit y = a + b*x for every dependent x predictor pair and return the results sorted by p-value."""
+    columns = list(dict.fromkeys(list(dep_vars) + list(predictors)))
+    position = {column: j for j, column in enumerate(columns)}
+    counts, means, cross_products, squares = pairwise_cross_products(column_matrix(dataset, columns))
+
+    records = []
+    for dep_var in dep_vars:
+        y = position[dep_var]
+        for predictor in predictors:
+            if predictor == dep_var:
+                continue
+            x = position[predictor]
+            records.append((dep_var, predictor, counts[y, x], cross_products[y, x], squares[x, y],
+                            squares[y, x], means[y, x], means[x, y]))
+
+    table = pd.DataFrame(records, columns=['dependent', 'predictor', 'n_obs', 'sxy', 'sxx', 'syy',
+                                           'mean_y', 'mean_x'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = table['sxy'] / table['sxx']
+        df_resid = table['n_obs'] - 2
+        sse = (table['syy'] - slope * table['sxy']).clip(lower=0)
+        std_err = np.sqrt(sse / df_resid / table['sxx'])
+        t_stat = slope / std_err
+        results = pd.DataFrame({
+            'dependent': table['dependent'],
+            'predictor': table['predictor'],
+            'n_obs': table['n_obs'].astype(int),
+            'slope': slope,
+            'intercept': table['mean_y'] - slope * table['mean_x'],
+            'std_err': std_err,
+            'r_squared': table['sxy'] ** 2 / (table['sxx'] * table['syy']),
+            't': t_stat,
+            'p_value': 2 * stats.t.sf(np.abs(t_stat), df_resid),
+        })
+    return results.sort_values('p_value', ignore_index=True, na_position='last')
+
+
+def collinear_predictors(X, predictors):
+    """Return the predictors whose centered columns of X are (nearly) linear combinations of the others.
+
+    Column pivoting orders the columns from most to least independent, so the dependent ones end up
+    last, with a diagonal of R that is tiny next to the column's own norm.
+    """
+    _, r, pivots = linalg.qr(X, mode='economic', pivoting=True)
+    norms = np.linalg.norm(X, axis=0)[pivots]
+    dependent = np.abs(np.diag(r)) ** 2 <= COLLINEARITY_TOL * norms ** 2
+    return [predictors[j] for j in pivots[dependent]]
+
+
+def _check_rank(diagonal, X, predictors):
+    """Raise ValueError naming the collinear predictors when a triangular factor of X has a near-zero diagonal."""
+    norms = np.linalg.norm(X, axis=0)
+    if np.all(diagonal ** 2 > COLLINEARITY_TOL * norms ** 2):
+        return
+    names = collinear_predictors(X, predictors) or predictors
+    single = len(names) == 1
+    raise ValueError(f"The predictors are collinear: {', '.join(map(str, names))} "
+                     f"{'is a linear combination' if single else 'are linear combinations'} of the other "
+                     f"predictors or constant. Drop {'it' if single else 'them'} and fit again.")
+
+
+@traced()
+def fit_ols(dataset, dep_var, predictors, method='cholesky'):
+    """Fit an OLS model with an intercept and return coefficients, standard errors, p-values and R².
+
+    The default solves the normal equations of the centered predictors by Cholesky, which needs one
+    pass over the data; method='qr' (also used when Cholesky finds the system singular) is slower but
+    more robust for nearly collinear predictors. Rows missing any of the variables are dropped.
+    Raises ValueError naming the predictors that are collinear with the others, whichever the method.
+    """
+    predictors = list(predictors)
+    matrix = column_matrix(dataset, [dep_var] + predictors)
+    complete = ~np.isnan(matrix).any(axis=1)
+    if not complete.all():
+        matrix = matrix[complete]
+    n_obs, n_slopes = len(matrix), len(predictors)
+    df_resid = n_obs - n_slopes - 1
+    if n_slopes < 1 or df_resid < 1:
+        raise ValueError("Need at least one predictor and more complete observations than parameters.")
+
+    # Centering absorbs the intercept and keeps the cross-product matrix well conditioned
+    x_means = matrix[:, 1:].mean(axis=0)
+    y_mean = matrix[:, 0].mean()
+    X = matrix[:, 1:] - x_means
+    y = matrix[:, 0] - y_mean
+
+    if method == 'cholesky':
+        try:
+            factor = linalg.cho_factor(X.T @ X)
+            # Cholesky of a singular or nearly singular system often succeeds with a tiny pivot
+            _check_rank(np.diag(factor[0]), X, predictors)
+            slopes = linalg.cho_solve(factor, X.T @ y)
+            xtx_inv = linalg.cho_solve(factor, np.eye(n_slopes))
+        except linalg.LinAlgError:
+            method = 'qr'
+    if method == 'qr':
+        q, r = np.linalg.qr(X)
+        _check_rank(np.abs(np.diag(r)), X, predictors)
+        slopes = linalg.solve_triangular(r, q.T @ y)
+        r_inv = linalg.solve_triangular(r, np.eye(n_slopes))
+        xtx_inv = r_inv @ r_inv.T
+
+    residuals = y - X @ slopes
+    sse = residuals @ residuals
+    sst = y @ y
+    sigma2 = sse / df_resid
+    intercept = y_mean - x_means @ slopes
+    coef = np.concatenate(([intercept], slopes))
+    std_err = np.sqrt(np.concatenate((
+        [sigma2 * (1.0 / n_obs + x_means @ xtx_inv @ x_means)],
+        sigma2 * np.diag(xtx_inv),
+    )))
+    t_stat = coef / std_err
+    r_squared = 1 - sse / sst if sst > 0 else np.nan
+    f_stat = ((sst - sse) / n_slopes) / sigma2
+
+    coefficients = pd.DataFrame({
+        'coef': coef,
+        'std_err': std_err,
+        't': t_stat,
+        'p_value': 2 * stats.t.sf(np.abs(t_stat), df_resid),
+    }, index=['const'] + predictors)
+    return {
+        'coefficients': coefficients,
+        'n_obs': n_obs,
+        'df_resid': df_resid,
+        'r_squared': r_squared,
+        'adj_r_squared': 1 - (1 - r_squared) * (n_obs - 1) / df_resid,
+        'f_statistic': f_stat,
+        'f_p_value': stats.f.sf(f_stat, n_slopes, df_resid),
+    }
@@ -0,0 +1,156 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_RESAMPLES = 10_000
+# Resamples drawn per block; blocks are the unit of seeding and of work sent to a process
+BLOCK_RESAMPLES = 500
+# Cap on the number of cells in one batched index matrix (resamples x rows)
+MAX_BATCH_CELLS = 20_000_000
+# Early stopping needs at least this many resamples, then stops once the p-value estimate is
+# more than EARLY_STOP_Z standard errors away from alpha
+MIN_RESAMPLES = 1000
+EARLY_STOP_Z = 3.29
+
+# Arrays shared with worker processes, set by _init_worker
+_shared = {}
+
+
+def _init_worker(arrays):
+    _shared.update(arrays)
+
+
+def _between_group_statistic(sums, counts, total):
+    """Between-group sum of squares per row of group sums; monotone in F for fixed group sizes."""
+    means = sums / counts
+    grand = total / counts.sum()
+    return ((means - grand) ** 2 * counts).sum(axis=1)
+
+
+def _permuted_group_sums(values, labels, n_groups, rng, n_resamples):
+    """Group sums of values under n_resamples random relabellings, computed in batched matrices."""
+    n_rows = len(values)
+    batch = max(1, min(n_resamples, MAX_BATCH_CELLS // max(n_rows, 1)))
+    results = []
+    for start in range(0, n_resamples, batch):
+        size = min(batch, n_resamples - start)
+        permuted = rng.permuted(np.broadcast_to(labels, (size, n_rows)), axis=1)
+        # Offset each resample's labels so one bincount gives every resample's group sums
+        flat = (permuted + (np.arange(size) * n_groups)[:, None]).ravel()
+        sums = np.bincount(flat, weights=np.broadcast_to(values, (size, n_rows)).ravel(),
+                           minlength=size * n_groups)
+        results.append(sums.reshape(size, n_groups))
+    return np.vstack(results)
+
+
+def _permutation_block(seed, n_resamples):
+    """Return resampled statistics for one block, reading the data from the worker's shared arrays."""
+    values, labels, counts = _shared['values'], _shared['labels'], _shared['counts']
+    rng = np.random.default_rng(seed)
+    sums = _permuted_group_sums(values, labels, len(counts), rng, n_resamples)
+    if len(counts) == 2:
+        return sums[:, 0] / counts[0] - sums[:, 1] / counts[1]
+    return _between_group_statistic(sums, counts, values.sum())
+
+
+def _run_blocks(block_function, arrays, seed, n_resamples, workers, keep_going=None):
+    """Run seeded blocks of resamples, in order, in this process or across a process pool.
+
+    Seeds are spawned per block, so results do not depend on the number of workers. keep_going, if
+    given, is called with the statistics gathered so far after every block and can stop the run early.
+    """
+    n_blocks = -(-n_resamples // BLOCK_RESAMPLES)
+    seeds = np.random.SeedSequence(seed).spawn(n_blocks)
+    sizes = [min(BLOCK_RESAMPLES, n_resamples - i * BLOCK_RESAMPLES) for i in range(n_blocks)]
+    collected = []
+    if not workers or workers == 1:
+        _init_worker(arrays)
+        for block_seed, size in zip(seeds, sizes):
+            collected.append(block_function(block_seed, size))
+            if keep_going is not None and not keep_going(np.concatenate(collected)):
+                break
+        return np.concatenate(collected)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(arrays,)) as pool:
+        # Submit a round of blocks at a time so early stopping does not waste a full run
+        for round_start in range(0, n_blocks, workers):
+            round_blocks = range(round_start, min(round_start + workers, n_blocks))
+            futures = [pool.submit(block_function, seeds[i], sizes[i]) for i in round_blocks]
+            for future in futures:
+                collected.append(future.result())
+                if keep_going is not None and not keep_going(np.concatenate(collected)):
+                    return np.concatenate(collected)
+    return np.concatenate(collected)
+
+
+def permutation_test(values, labels, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1, alpha=0.05,
+                     early_stop=True):
+    """Permutation test for a difference between groups.
+
+    values are the observations and labels their group codes (0 .. k-1, no missing values). With two
+    groups the statistic is the difference in means (two-sided); with more it is the between-group sum
+    of squares, equivalent to the F statistic. Returns the observed statistic and the p-value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.intp)
+    counts = np.bincount(labels).astype(np.float64)
+    if len(counts) < 2 or (counts == 0).any():
+        raise ValueError("A permutation test needs at least two non-empty groups.")
+    observed_sums = np.bincount(labels, weights=values, minlength=len(counts))
+    if len(counts) == 2:
+        observed = observed_sums[0] / counts[0] - observed_sums[1] / counts[1]
+    else:
+        observed = _between_group_statistic(observed_sums[None, :], counts, values.sum())[0]
+    # Small tolerance so that resamples tying with the observed statistic count as extreme
+    threshold = abs(observed) * (1 - 1e-12)
+
+    def exceed_count(statistics):
+        return np.count_nonzero(np.abs(statistics) >= threshold)
+
+    def keep_going(statistics):
+        done = len(statistics)
+        if not early_stop or done < MIN_RESAMPLES:
+            return True
+        p_hat = (exceed_count(statistics) + 1) / (done + 1)
+        std_err = np.sqrt(p_hat * (1 - p_hat) / done)
+        return abs(p_hat - alpha) <= EARLY_STOP_Z * std_err
+
+    statistics = _run_blocks(_permutation_block, {'values': values, 'labels': labels, 'counts': counts},
+                             seed, n_resamples, workers, keep_going)
+    return {
+        'statistic': float(observed),
+        'p_value': float((exceed_count(statistics) + 1) / (len(statistics) + 1)),
+        'n_resamples': len(statistics),
+        'stopped_early': len(statistics) < n_resamples,
+    }
+
+
+def _bootstrap_block(seed, n_resamples):
+    """Return bootstrap differences in means for one block from the worker's shared arrays."""
+    first, second = _shared['first'], _shared['second']
+    rng = np.random.default_rng(seed)
+    differences = []
+    batch = max(1, min(n_resamples, MAX_BATCH_CELLS // max(len(first) + len(second), 1)))
+    for start in range(0, n_resamples, batch):
+        size = min(batch, n_resamples - start)
+        first_means = first[rng.integers(0, len(first), (size, len(first)))].mean(axis=1)
+        second_means = second[rng.integers(0, len(second), (size, len(second)))].mean(axis=1)
+        differences.append(first_means - second_means)
+    return np.concatenate(differences)
+
+
+def bootstrap_mean_difference(first, second, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1,
+                              confidence=0.95):
+    """Percentile bootstrap confidence interval for the difference in means of two samples."""
+    first = np.asarray(first, dtype=np.float64)
+    second = np.asarray(second, dtype=np.float64)
+    differences = _run_blocks(_bootstrap_block, {'first': first, 'second': second},
+                              seed, n_resamples, workers)
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(differences, [tail, 100 - tail])
+    return {
+        'difference': float(first.mean() - second.mean()),
+        'ci_low': float(low),
+        'ci_high': float(high),
+        'confidence': confidence,
+    }
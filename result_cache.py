@@ -0,0 +1,204 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+
+from dataset_cache import file_fingerprint
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'group2', 'results')
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_DISK_ENTRIES = 4096
+
+_MISSING = object()
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+class ResultCache:
+    """Memoized analysis results keyed by dataset fingerprint, analysis name and parameters.
+
+    Results live in an in-memory LRU of max_entries. With a cache_dir they are also pickled to disk
+    as <path digest>-<fingerprint digest>-<entry digest>.pkl, so they survive restarts. The dataset
+    fingerprint (size, mtime and sampled content hash) is checked on every lookup; when the file has
+    changed, every result of its previous version is dropped from memory and disk. The first lookup
+    of a file in a run also removes the files pickled for its older versions by earlier runs.
+
+    A lookup can name the fingerprint the file had when its data was loaded; once the file no longer
+    matches it, results are computed from the data in memory but neither looked up nor stored, so a
+    result of the old data is never kept under the new version of the file.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, cache_dir=None, max_disk_entries=DEFAULT_MAX_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.uncached = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def for_file(self, file_path, fingerprint=None):
+        """Return a handle that memoizes results for the dataset in file_path, as loaded at fingerprint."""
+        return DatasetResults(self, file_path, fingerprint)
+
+    def _current_version(self, fingerprint):
+        path_digest, version = _digest(fingerprint['path']), _digest(fingerprint)
+        if path_digest not in self.versions:
+            # Results pickled by an earlier run for an older version of the file can never match again
+            self._remove_stale_files(path_digest, version)
+        elif self.versions[path_digest] != version:
+            self.invalidate(path_digest)
+        self.versions[path_digest] = version
+        return path_digest, version
+
+    def invalidate(self, path_digest):
+        """Drop every stored result of a dataset, in memory and on disk."""
+        for key in [key for key in self.entries if key.startswith(path_digest + '-')]:
+            del self.entries[key]
+        if self.cache_dir:
+            for file_name in glob.glob(os.path.join(self.cache_dir, f"{path_digest}-*.pkl")):
+                try:
+                    os.remove(file_name)
+                except OSError:
+                    pass
+        self.invalidations += 1
+
+    def _remove_stale_files(self, path_digest, version):
+        """Remove the result files of a dataset that belong to any version but the current one."""
+        if not self.cache_dir:
+            return
+        current = f"{path_digest}-{version}-"
+        for file_name in glob.glob(os.path.join(self.cache_dir, f"{path_digest}-*.pkl")):
+            if not os.path.basename(file_name).startswith(current):
+                try:
+                    os.remove(file_name)
+                except OSError:
+                    pass
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, file_path, analysis, params, loaded=None):
+        """Return (key, stored result) for the current version of the file, or _MISSING as the result.
+
+        The key is None when the file has changed since it was loaded at the loaded fingerprint.
+        """
+        fingerprint = file_fingerprint(file_path)
+        if loaded is not None and fingerprint != loaded:
+            return None, _MISSING
+        path_digest, version = self._current_version(fingerprint)
+        key = f"{path_digest}-{version}-{_digest([analysis, params])}"
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return key, self.entries[key]
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as handle:
+                    value = pickle.load(handle)
+                os.utime(self._disk_path(key))
+                self._remember(key, value)
+                self.hits += 1
+                self.disk_hits += 1
+                return key, value
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+        self.misses += 1
+        return key, _MISSING
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if not self.cache_dir:
+            return
+        tmp_path = self._disk_path(key) + f'.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as handle:
+                pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._disk_path(key))
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # Unpicklable results stay memory-only
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._enforce_disk_cap()
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _enforce_disk_cap(self):
+        """Remove the least recently used result files beyond max_disk_entries."""
+        files = glob.glob(os.path.join(self.cache_dir, '*.pkl'))
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=lambda file_name: os.path.getmtime(file_name))
+        for file_name in files[:len(files) - self.max_disk_entries]:
+            try:
+                os.remove(file_name)
+            except OSError:
+                pass
+
+    def memoize(self, file_path, analysis, params, compute, loaded=None):
+        """Return the stored result of analysis with params for the current file, computing it on a miss."""
+        key, value = self.get(file_path, analysis, params, loaded)
+        if key is None:
+            if not self.uncached:
+                print("The dataset file has changed since it was loaded; results are no longer cached. "
+                      "Restart to analyze the new version.")
+            self.uncached += 1
+            return compute()
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries),
+            'invalidations': self.invalidations,
+            'uncached': self.uncached,
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"Result cache: {stats['hits']} hits ({stats['disk_hits']} from disk), {stats['misses']} misses, "
+                f"{stats['hit_rate']:.0%} hit rate, {stats['entries']} results in memory")
+
+
+class DatasetResults:
+    """ResultCache bound to one dataset file, as passed to the conduct_* functions.
+
+    fingerprint is the file_fingerprint of the file when the dataset was loaded, or None to trust
+    the file as it is at each lookup.
+    """
+
+    def __init__(self, cache, file_path, fingerprint=None):
+        self.cache = cache
+        self.file_path = file_path
+        self.fingerprint = fingerprint
+
+    def memoize(self, analysis, params, compute):
+        return self.cache.memoize(self.file_path, analysis, params, compute, self.fingerprint)
+
+
+def memoize(results, analysis, params, compute):
+    """Return compute(), memoized in results (a DatasetResults) when there is one."""
+    if results is None:
+        return compute()
+    return results.memoize(analysis, params, compute)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'group2', 'sentiment_scores.sqlite')
+DEFAULT_MAX_ENTRIES = 5_000_000
+# SQLite caps the number of bound parameters in one statement
+LOOKUP_BATCH = 900
+# Eviction trims the store to this share of max_entries, so the next evictions are many stores away
+EVICT_TO = 0.95
+
+
+def package_version(package):
+    """Return the installed version of a package, or 'unknown'."""
+    try:
+        from importlib.metadata import version
+        return version(package)
+    except Exception:
+        return 'unknown'
+
+
+def _is_null(text):
+    return not isinstance(text, str) and pd.isna(text)
+
+
+class SentimentScoreCache:
+    """SQLite store of sentiment scores keyed by a hash of the scorer name, scorer version and text.
+
+    Missing texts (None, NaN) are never stored, so they cannot share a key with the text 'nan' or 'None'.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS scores (key BLOB PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL)"
+            " WITHOUT ROWID")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        self.connection.commit()
+        # Upper bound on the stored entries, counted exactly only when it passes max_entries
+        self.entries = self._count()
+
+    def _count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    @staticmethod
+    def text_key(scorer, text):
+        return hashlib.sha1(f"{scorer}\0{text}".encode('utf-8', 'surrogatepass')).digest()
+
+    def lookup(self, scorer, texts):
+        """Return the stored result for each text, with None for texts that have not been scored (or are missing)."""
+        keys = [None if _is_null(text) else self.text_key(scorer, text) for text in texts]
+        present = [key for key in keys if key is not None]
+        found = {}
+        for start in range(0, len(present), LOOKUP_BATCH):
+            batch = present[start:start + LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.connection.execute(
+                f"SELECT key, result FROM scores WHERE key IN ({placeholders})", batch)
+            found.update((key, json.loads(result)) for key, result in rows)
+
+        now = time.time()
+        self.connection.executemany("UPDATE scores SET last_used = ? WHERE key = ?",
+                                    [(now, key) for key in found])
+        self.connection.commit()
+        self.hits += len(found)
+        self.misses += len(present) - len(found)
+        return [found.get(key) for key in keys]
+
+    def store(self, scorer, texts, results):
+        """Store newly computed results, evicting the least recently used entries once there are too many."""
+        now = time.time()
+        rows = [(self.text_key(scorer, text), json.dumps(result), now)
+                for text, result in zip(texts, results) if not _is_null(text)]
+        self.connection.executemany("INSERT OR REPLACE INTO scores (key, result, last_used) VALUES (?, ?, ?)", rows)
+        self.connection.commit()
+        # Replaced rows are counted too, so the running count can only overestimate
+        self.entries += len(rows)
+        if self.entries > self.max_entries:
+            self.evict()
+
+    def evict(self):
+        """Trim the store to EVICT_TO of max_entries when it holds more than max_entries; return the rows removed."""
+        count = self._count()
+        excess = count - int(self.max_entries * EVICT_TO) if count > self.max_entries else 0
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY last_used LIMIT ?)", (excess,))
+            self.connection.commit()
+        self.entries = count - excess
+        return excess
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': self._count()}
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import time
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILED_MODULES = ['main', 'conduct_anova', 'conduct_t_test', 'conduct_chi_square', 'conduct_regression',
+                    'conduct_sentiment_analysis', 'batch_runner']
+FIRST_PROMPT = b"ENTER THE PATH TO YOUR DATASET"
+PROMPT_TIMEOUT_S = 60
+
+
+def time_import(module_name):
+    """Return the seconds a fresh interpreter takes to import a module, or None if the import fails."""
+    code = ("import time; start = time.perf_counter(); "
+            f"import {module_name}; print(time.perf_counter() - start)")
+    completed = subprocess.run([sys.executable, '-c', code], cwd=PACKAGE_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return None
+    return float(completed.stdout.strip().splitlines()[-1])
+
+
+def time_to_first_prompt(timeout=PROMPT_TIMEOUT_S):
+    """Return the seconds from launching main.py until it asks for the dataset path."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(PACKAGE_DIR, 'main.py')], cwd=PACKAGE_DIR,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output = b''
+    try:
+        while FIRST_PROMPT not in output:
+            chunk = os.read(process.stdout.fileno(), 4096)
+            if not chunk or time.perf_counter() - start > timeout:
+                return None
+            output += chunk
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def profile_startup(budget):
+    """Print the time to the first prompt and per-module import times; return whether the budget is met."""
+    print(f"{'Module':<30}{'Import time (s)':>16}")
+    print("-" * 46)
+    for module_name in PROFILED_MODULES:
+        elapsed = time_import(module_name)
+        print(f"{module_name:<30}{'failed' if elapsed is None else f'{elapsed:.3f}':>16}")
+
+    elapsed = time_to_first_prompt()
+    if elapsed is None:
+        print("\nmain.py did not reach its first prompt.")
+        return False
+    within_budget = elapsed <= budget
+    print(f"\nTime to first prompt: {elapsed:.3f}s (budget {budget:.3f}s) - "
+          f"{'within budget' if within_budget else 'OVER BUDGET'}")
+    return within_budget
@@ -0,0 +1,315 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from column_profiler import CATEGORICAL_MAX_UNIQUE, PROFILE_FIELDS
+from compact_loader import DEFAULT_CHUNKSIZE
+from normality import chunk_moments, merge_moments
+
+# Compactor size of the quantile sketch; the rank error of a quantile is roughly 1.7 / SKETCH_K
+SKETCH_K = 200
+# Levels of the sketch never shrink below this many items
+SKETCH_MIN_CAPACITY = 8
+# Distinct values tracked per column by the heavy-hitters counter; must exceed CATEGORICAL_MAX_UNIQUE
+HEAVY_HITTERS = 64
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch in the style of KLL.
+
+    Values enter level 0. A level that outgrows its capacity is sorted and every other value, from a
+    random offset, moves up one level with twice the weight. Lower levels get geometrically smaller
+    capacities, so the sketch holds O(k log(n / k)) values at most whatever the input size.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(SKETCH_MIN_CAPACITY, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so the total weight is preserved exactly
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                paired = items[:len(items) - len(keep)]
+                promoted = paired[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+                # Capacities depend on the height, so recheck from the bottom after the sketch grows
+                level = 0
+                continue
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.n += len(values)
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Return the approximate q-quantile; exact while the sketch has not had to compact."""
+        if self.n == 0:
+            return np.nan
+        if len(self.levels) == 1:
+            return float(np.quantile(self.levels[0], q))
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(values[order[min(position, len(values) - 1)]])
+
+    def size(self):
+        return sum(len(items) for items in self.levels)
+
+
+class HeavyHitters:
+    """Misra-Gries counter of the most frequent values.
+
+    Each kept count is at most (values seen) / (capacity + 1) below the true count. While no more
+    than capacity distinct values have been seen, the counts are exact.
+    """
+
+    def __init__(self, capacity=HEAVY_HITTERS):
+        self.capacity = capacity
+        self.counts = {}
+        self.exact = True
+
+    def update_counts(self, values, counts):
+        values, counts = np.asarray(values, dtype=object), np.asarray(counts, dtype=np.int64)
+        if len(counts) > self.capacity:
+            # Summarize the batch on its own first (Misra-Gries summaries merge), keeping the dict small
+            threshold = np.partition(counts, -(self.capacity + 1))[-(self.capacity + 1)]
+            kept = counts > threshold
+            values, counts = values[kept], counts[kept] - threshold
+            self.exact = False
+        for value, count in zip(values, counts):
+            self.counts[value] = self.counts.get(value, 0) + int(count)
+        self._reduce()
+
+    def update(self, values):
+        counts = pd.Series(values).value_counts(dropna=True)
+        self.update_counts(counts.index, counts.to_numpy())
+
+    def merge(self, other):
+        self.exact = self.exact and other.exact
+        self.update_counts(list(other.counts.keys()), list(other.counts.values()))
+        return self
+
+    def _reduce(self):
+        if len(self.counts) <= self.capacity:
+            return
+        # Subtracting the (capacity + 1)-th largest count is the batched form of the Misra-Gries update
+        threshold = sorted(self.counts.values(), reverse=True)[self.capacity]
+        self.counts = {value: count - threshold for value, count in self.counts.items() if count > threshold}
+        self.exact = False
+
+    def top(self, k=10):
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def mode(self):
+        """Return the most frequent value, the smallest one on ties as in profile_columns."""
+        if not self.counts:
+            return np.nan
+        highest = max(self.counts.values())
+        tied = [value for value, count in self.counts.items() if count == highest]
+        try:
+            return min(tied)
+        except TypeError:
+            return tied[0]
+
+
+class ColumnSummary:
+    """Constant-memory, mergeable summary of one column: moments, a quantile sketch and heavy hitters."""
+
+    def __init__(self, seed=0):
+        self.numeric = True
+        self.rows = 0
+        self.null_count = 0
+        self.moments = (0, 0.0, 0.0, 0.0, 0.0)
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch = QuantileSketch(seed=seed)
+        self.heavy = HeavyHitters()
+
+    def update(self, series):
+        self.rows += len(series)
+        self.null_count += int(series.isna().sum())
+        if pd.api.types.is_numeric_dtype(series):
+            values = np.asarray(series, dtype=np.float64)
+            values = values[~np.isnan(values)]
+            if len(values):
+                self.moments = merge_moments(self.moments, chunk_moments(values))
+                self.min = min(self.min, values.min())
+                self.max = max(self.max, values.max())
+                self.sketch.update(values)
+                self.heavy.update_counts(*np.unique(values, return_counts=True))
+        else:
+            self.numeric = False
+            self.heavy.update(series)
+
+    def merge(self, other):
+        self.numeric = self.numeric and other.numeric
+        self.rows += other.rows
+        self.null_count += other.null_count
+        self.moments = merge_moments(self.moments, other.moments)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+        self.heavy.merge(other.heavy)
+        return self
+
+    def finalize(self):
+        """Return the column's statistics with the fields of column_profiler.profile_columns."""
+        nunique = len(self.heavy.counts) if self.heavy.exact else np.nan
+        stats = {'null_count': self.null_count, 'nunique': nunique, 'mode': self.heavy.mode(),
+                 'mean': np.nan, 'median': np.nan, 'skew': np.nan, 'min': np.nan, 'max': np.nan}
+        if not self.numeric:
+            stats['kind'] = 'Categorical'
+            stats['count'] = self.rows - self.null_count
+            stats['analysis_type'] = 'Categorical'
+            return stats
+
+        count, mean, m2, m3, m4 = self.moments
+        stats.update(kind='Numerical', count=count)
+        if count:
+            stats.update(mean=mean, median=self.sketch.quantile(0.5), min=self.min, max=self.max)
+        if count >= 3:
+            m2, m3 = m2 / count, m3 / count
+            # Adjusted Fisher-Pearson coefficient, as in profile_columns
+            if m2 <= 1e-14 * max(mean * mean, 1.0):
+                stats['skew'] = 0.0
+            else:
+                stats['skew'] = m3 / m2 ** 1.5 * np.sqrt(count * (count - 1)) / (count - 2)
+        # More distinct values than the counter tracks means more than CATEGORICAL_MAX_UNIQUE
+        few_values = self.heavy.exact and nunique <= CATEGORICAL_MAX_UNIQUE
+        stats['analysis_type'] = 'Categorical' if few_values else 'Continuous'
+        return stats
+
+
+def summarize_chunks(chunks, seed=0):
+    """Return {column: ColumnSummary} for an iterable of DataFrame chunks."""
+    summaries = {}
+    for chunk in chunks:
+        for column in chunk.columns:
+            if column not in summaries:
+                summaries[column] = ColumnSummary(seed)
+            summaries[column].update(chunk[column])
+    return summaries
+
+
+def merge_summaries(parts):
+    """Merge several {column: ColumnSummary} results, e.g. from different chunks or files, in order."""
+    merged = {}
+    for part in parts:
+        for column, summary in part.items():
+            merged[column] = merged[column].merge(summary) if column in merged else summary
+    return merged
+
+
+def summary_table(summaries):
+    """Return the summaries as a DataFrame with the columns (and moments attribute) of profile_columns."""
+    rows = {column: summary.finalize() for column, summary in summaries.items()}
+    table = pd.DataFrame.from_dict(rows, orient='index', columns=PROFILE_FIELDS)
+    table.attrs['moments'] = {column: summary.moments for column, summary in summaries.items()
+                              if summary.numeric and summary.moments[0]}
+    return table
+
+
+class _ByteRange(io.RawIOBase):
+    """Readable view of bytes [start, stop) of a file."""
+
+    def __init__(self, path, start, stop):
+        self.handle = open(path, 'rb')
+        self.handle.seek(start)
+        self.remaining = stop - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        data = self.handle.read(size)
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self.handle.close()
+        super().close()
+
+
+def _line_offsets(file_path, parts):
+    """Split a file after its header into about equal byte ranges that begin at line starts."""
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as handle:
+        handle.readline()
+        offsets = [handle.tell()]
+        for i in range(1, parts):
+            handle.seek(max(offsets[-1], size * i // parts))
+            handle.readline()
+            offsets.append(handle.tell())
+    offsets.append(size)
+    return sorted(set(offsets))
+
+
+def _summarize_range(task):
+    file_path, names, start, stop, chunksize, seed = task
+    with _ByteRange(file_path, start, stop) as source:
+        reader = pd.read_csv(io.BufferedReader(source), header=None, names=names, chunksize=chunksize)
+        return summarize_chunks(reader, seed)
+
+
+def _summarize_file(task):
+    file_path, chunksize, seed = task
+    return summarize_chunks(pd.read_csv(file_path, chunksize=chunksize), seed)
+
+
+def summarize_csv(file_path, chunksize=DEFAULT_CHUNKSIZE, workers=1):
+    """Summarize every column of a CSV in one streaming pass and return a profile_columns-style table.
+
+    With several workers the file is split into byte ranges at line boundaries, one per worker, and
+    the partial summaries are merged. Splitting assumes that no quoted field contains a newline.
+    """
+    if not workers or workers == 1:
+        return summary_table(_summarize_file((file_path, chunksize, 0)))
+    names = list(pd.read_csv(file_path, nrows=0).columns)
+    offsets = _line_offsets(file_path, workers)
+    tasks = [(file_path, names, start, stop, chunksize, seed)
+             for seed, (start, stop) in enumerate(zip(offsets[:-1], offsets[1:]))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return summary_table(merge_summaries(pool.map(_summarize_range, tasks)))
+
+
+def summarize_files(file_paths, chunksize=DEFAULT_CHUNKSIZE, workers=None):
+    """Summarize CSV files with the same columns in parallel, one file per task, as one table."""
+    tasks = [(file_path, chunksize, seed) for seed, file_path in enumerate(file_paths)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        parts = map(_summarize_file, tasks)
+        return summary_table(merge_summaries(parts))
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return summary_table(merge_summaries(pool.map(_summarize_file, tasks)))
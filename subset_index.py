@@ -0,0 +1,248 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+import numpy as np
+import pandas as pd
+
+from batch_runner import RESULT_FIELDS, execute_job
+from column_profiler import profile_columns
+from group_statistics import factorize_groups
+from instrumentation import span, traced
+
+# Variables each stratified analysis asks for, in the order of its runner's arguments
+ANALYSIS_VARIABLES = {
+    'anova': ['cont_var', 'cat_var'],
+    't_test': ['cont_var', 'cat_var'],
+    'chi_square': ['var1', 'var2'],
+    'regression': ['dep_var', 'indep_var'],
+}
+VARIABLE_PROMPTS = {
+    'cont_var': "Enter a continuous (interval/ratio) variable: ",
+    'cat_var': "Enter a categorical variable: ",
+    'var1': "Enter the first categorical variable: ",
+    'var2': "Enter the second categorical variable: ",
+    'dep_var': "Enter the dependent variable: ",
+    'indep_var': "Enter the independent variable: ",
+}
+
+
+def take_rows(dataset, positions, columns=None):
+    """Return the rows at the given positions of the given columns (default: all) as a DataFrame."""
+    columns = list(dataset.columns if columns is None else columns)
+    if isinstance(dataset, pd.DataFrame):
+        return dataset[columns].take(positions)
+    # A column store pages in only the columns asked for, and of those only the rows gathered
+    return pd.DataFrame({column: dataset[column].take(positions).reset_index(drop=True) for column in columns})
+
+
+class _ColumnIndex:
+    """Row positions of a column grouped by level: positions[offsets[i]:offsets[i + 1]] are the rows of level i."""
+
+    def __init__(self, series):
+        self.codes, self.labels = factorize_groups(series)
+        # A stable sort keeps each level's positions ascending; missing values (-1) sort first
+        self.positions = np.argsort(self.codes, kind='stable')
+        self.offsets = np.cumsum(np.bincount(self.codes + 1, minlength=len(self.labels) + 1))
+
+    def level_codes(self, values):
+        """Return the codes of the given levels, matched by their text."""
+        lookup = {str(label): code for code, label in enumerate(self.labels)}
+        missing = [value for value in values if str(value) not in lookup]
+        if missing:
+            raise KeyError(f"Unknown level(s): {', '.join(map(str, missing))}.")
+        return [lookup[str(value)] for value in values]
+
+    def level_positions(self, code):
+        return self.positions[self.offsets[code]:self.offsets[code + 1]]
+
+    def size(self, codes):
+        return sum(self.offsets[code + 1] - self.offsets[code] for code in codes)
+
+
+class SubsetIndex:
+    """Indexes over the categorical columns of a dataset for fast filtering and stratification.
+
+    Each column's index is built on first use: one stable argsort of its codes, so the rows of every
+    level are a contiguous run of ascending positions. A conjunctive filter takes the smallest
+    matching level set and keeps the candidates whose codes pass the other conditions, never scanning
+    the whole dataset again. Rows are gathered only for the matching positions and, when the caller
+    names them, only for the columns it needs.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self._indexes = {}
+
+    def index(self, column):
+        if column not in self.dataset.columns:
+            raise KeyError(f"Column '{column}' does not exist in the dataset.")
+        if column not in self._indexes:
+            with span('subset_index.build', column=column):
+                self._indexes[column] = _ColumnIndex(self.dataset[column])
+        return self._indexes[column]
+
+    def levels(self, column):
+        return [str(label) for label in self.index(column).labels]
+
+    def positions(self, filters):
+        """Return the ascending row positions that match every filter in {column: value or list of values}."""
+        if not filters:
+            return np.arange(len(self.dataset))
+        conditions = []
+        for column, values in filters.items():
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            index = self.index(column)
+            codes = index.level_codes(values)
+            conditions.append((index.size(codes), index, codes))
+        conditions.sort(key=lambda condition: condition[0])
+
+        _, index, codes = conditions[0]
+        candidates = np.concatenate([index.level_positions(code) for code in codes])
+        if len(codes) > 1:
+            candidates.sort()
+        for _, index, codes in conditions[1:]:
+            # A lookup table over the codes (plus a final False for missing, code -1) tests every candidate at once
+            allowed = np.zeros(len(index.labels) + 1, dtype=bool)
+            allowed[codes] = True
+            candidates = candidates[allowed[index.codes[candidates]]]
+        return candidates
+
+    def select(self, filters, columns=None):
+        """Return the rows that match every filter as a DataFrame of the given columns (default: all)."""
+        with span('subset_index.select'):
+            return take_rows(self.dataset, self.positions(filters), columns)
+
+    def strata(self, column):
+        """Return {level: row positions} for every level of a column; the positions are views of its index."""
+        index = self.index(column)
+        return {str(label): index.level_positions(code) for code, label in enumerate(index.labels)}
+
+
+def job_columns(job):
+    """Return the dataset columns a job reads, from its variable parameters."""
+    return list(dict.fromkeys(job[name] for name in VARIABLE_PROMPTS if name in job))
+
+
+def _run_stratum(dataset, level, positions, job):
+    record = {'level': level, 'rows': len(positions)}
+    start = time.perf_counter()
+    try:
+        result = execute_job(take_rows(dataset, positions, job_columns(job)), job)
+        record.update({field: result.get(field) for field in RESULT_FIELDS if field in result})
+        record['error'] = None
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['elapsed_s'] = time.perf_counter() - start
+    return record
+
+
+@traced()
+def run_stratified(index, column, job, workers=None):
+    """Run one job, e.g. {'analysis': 'anova', 'cont_var': 'Weight', 'cat_var': 'MTRANS'}, per level of column.
+
+    Each level gathers its own rows of just the job's columns, inside the thread that analyzes it, so
+    only the levels being analyzed are held at once and nothing is pickled; NumPy and SciPy release
+    the GIL for the heavy array work. Returns one row per level.
+    """
+    strata = index.strata(column)
+    workers = workers or min(len(strata), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        records = list(pool.map(lambda item: _run_stratum(index.dataset, item[0], item[1], job), strata.items()))
+    return pd.DataFrame(records)
+
+
+def parse_filters(text):
+    """Parse 'Gender=Female, MTRANS=Walking|Bike' into {'Gender': ['Female'], 'MTRANS': ['Walking', 'Bike']}."""
+    filters = {}
+    for condition in text.split(','):
+        if not condition.strip():
+            continue
+        column, separator, values = condition.partition('=')
+        if not separator or not column.strip() or not values.strip():
+            raise ValueError(f"Invalid filter '{condition.strip()}', expected column=value.")
+        filters.setdefault(column.strip(), []).extend(value.strip() for value in values.split('|'))
+    return filters
+
+
+def _choose_variables(analysis, columns, exclude):
+    params = {}
+    for name in ANALYSIS_VARIABLES[analysis]:
+        while True:
+            value = input(VARIABLE_PROMPTS[name])
+            if value in columns and value != exclude:
+                params[name] = value
+                break
+            print("Invalid choice. Please select a valid variable.")
+    return params
+
+
+@traced()
+def conduct_subset_analysis(dataset, index, profile=None):
+    if dataset is None:
+        print("Dataset is not available for analysis.")
+        return
+    if profile is None:
+        profile = profile_columns(dataset)
+    categorical_vars = [column for column, var_type in profile['analysis_type'].items() if var_type == 'Categorical']
+    if not categorical_vars:
+        print("No categorical variables found to filter or stratify by.")
+        return
+
+    # Step 1: Display the variables that can be filtered or stratified by
+    print("\nFollowing are the categorical variables available for filtering and stratifying:")
+    print(f"{'Variable':<32}{'Levels':<10}")
+    print("-" * 42)
+    for column in categorical_vars:
+        print(f"{column:<32}{profile.loc[column, 'nunique']:<10}")
+
+    mode = input("Enter 1 to run an analysis on filtered rows or 2 to stratify an analysis by a variable: ")
+    if mode == '1':
+        # Step 2: Resolve the filters through the indexes and run any analysis on the matching rows
+        text = input("Enter filters as column=value separated by commas, with | between alternative values "
+                     "(e.g. Gender=Female, MTRANS=Walking|Bike): ")
+        try:
+            subset = index.select(parse_filters(text))
+        except (ValueError, KeyError) as e:
+            print(f"Invalid filter: {e}")
+            return
+        print(f"{len(subset)} of {len(dataset)} rows match the filters.")
+        if len(subset) == 0:
+            return
+
+        print("\nWhich analysis do you want to run on these rows?")
+        modules = [('ANOVA', 'conduct_anova'), ('t-Test', 'conduct_t_test'), ('chi-Square', 'conduct_chi_square'),
+                   ('Regression', 'conduct_regression'), ('Sentiment Analysis', 'conduct_sentiment_analysis'),
+                   ('Correlation', 'conduct_correlation')]
+        for number, (name, _) in enumerate(modules, start=1):
+            print(f"{number}. Conduct {name}")
+        choice = input(f"Enter your choice (1-{len(modules)}): ")
+        if not choice.isdigit() or not 1 <= int(choice) <= len(modules):
+            print("Invalid choice, please select a valid option.")
+            return
+        module_name = modules[int(choice) - 1][1]
+        module = import_module(module_name)
+        getattr(module, module_name)(subset, profile_columns(subset))
+    elif mode == '2':
+        # Step 2: Run one analysis per level of the stratifying variable, in parallel
+        while True:
+            column = input("Enter the categorical variable to stratify by: ")
+            if column in categorical_vars:
+                break
+            print("Invalid choice. Please select a valid categorical variable.")
+        while True:
+            analysis = input(f"Enter the analysis to run per level ({', '.join(ANALYSIS_VARIABLES)}): ")
+            if analysis in ANALYSIS_VARIABLES:
+                break
+            print("Invalid choice. Please select a valid analysis.")
+        job = {'analysis': analysis, **_choose_variables(analysis, dataset.columns, column)}
+
+        print(f"\nPerforming {analysis} for each of the {len(index.levels(column))} levels of {column}…")
+        results = run_stratified(index, column, job)
+        columns = [field for field in ['level', 'rows', 'test', 'statistic', 'p_value', 'significant', 'error']
+                   if field in results.columns]
+        with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.max_colwidth', 60):
+            print(results[columns].to_string(index=False))
+    else:
+        print("Invalid choice, please enter 1 or 2.")